@@ -4,6 +4,10 @@ from routes.server import server_bp
 from routes.wireguard import wireguard_bp
 from routes.metrics import metrics_bp
 from flask_cors import CORS
+from services.config_store import ConfigStore
+from services.key_service import KeyService
+from services.metrics_store import MetricsStore
+from services.peer_registry import PeerRegistry
 
 def create_app():
     app = Flask(__name__)
@@ -25,4 +29,16 @@ def create_app():
     app.register_blueprint(wireguard_bp)
     app.register_blueprint(metrics_bp)
     
+    # Finish a configuration commit interrupted by a crash
+    ConfigStore.recover()
+    
+    # Build the in-memory peer index once at startup
+    PeerRegistry.load()
+    
+    # Pre-generate keys for the first peer creations
+    KeyService.start_key_pool()
+    
+    # Collect the metrics snapshot in the background
+    MetricsStore.start()
+    
     return app
\ No newline at end of file
@@ -0,0 +1,127 @@
+"""Micro-benchmark of the join of the fleet vectors in get_fleet_metrics
+
+Builds the five instant vectors the metrics collector fetches from
+Prometheus (counters, handshake and rates, one series per peer) and
+times PrometheusService.get_fleet_metrics, whose queries are answered
+with the synthetic vectors and joined through hash indexes, against the
+former nested loop over the other vectors. Both results are checked to
+be identical.
+
+    python benchmarks/bandwidth_join.py --series 10000
+"""
+import argparse
+import base64
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from services.prometheus_service import PrometheusService
+
+
+def vector(public_keys, value):
+    return {
+        'status': 'success',
+        'data': {
+            'resultType': 'vector',
+            'result': [
+                {
+                    'metric': {'public_key': key, 'interface': 'wg0', 'allowed_ips': f'10.0.{i // 250}.{i % 250}/32'},
+                    'value': [time.time(), str(value())]
+                }
+                for i, key in enumerate(public_keys)
+            ]
+        }
+    }
+
+
+def shuffled(public_keys):
+    # Ordre différent d'un vecteur à l'autre, comme dans une vraie réponse
+    keys = public_keys[:]
+    random.shuffle(keys)
+    return keys
+
+
+def peer_stats(public_key, labels, sent, recv, handshake):
+    return PrometheusService.build_peer_stats(
+        public_key, int(sent), int(recv), int(handshake),
+        labels.get('interface', ''), labels.get('allowed_ips', '')
+    )
+
+
+def nested_loop_join(sent, recv, handshakes, sent_rates, recv_rates):
+    """Scan of the other vectors for every peer"""
+    def find(result, public_key):
+        for metric in result['data']['result']:
+            if metric['metric']['public_key'] == public_key:
+                return float(metric['value'][1])
+        return None
+
+    fleet = {}
+    for metric in sent['data']['result']:
+        public_key = metric['metric']['public_key']
+        sent_rate = find(sent_rates, public_key)
+        fleet[public_key] = {
+            'stats': peer_stats(
+                public_key, metric['metric'], float(metric['value'][1]),
+                find(recv, public_key) or 0, find(handshakes, public_key) or 0
+            ),
+            'bandwidth': (
+                PrometheusService.build_bandwidth(public_key, sent_rate, find(recv_rates, public_key) or 0)
+                if sent_rate is not None else None
+            )
+        }
+    return fleet
+
+
+def comparable(fleet):
+    # Le temps écoulé depuis le handshake dépend de l'instant du calcul
+    return {
+        public_key: (dict(peer['stats'], time_since_handshake=None), peer['bandwidth'])
+        for public_key, peer in fleet.items()
+    }
+
+
+def timed(function, repeat):
+    best = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = function()
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best, result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--series', type=int, default=10000)
+    parser.add_argument('--repeat', type=int, default=3)
+    args = parser.parse_args()
+
+    public_keys = [base64.b64encode(os.urandom(32)).decode() for _ in range(args.series)]
+    now = time.time()
+    vectors = (
+        vector(public_keys, lambda: random.randint(0, 1 << 40)),
+        vector(shuffled(public_keys), lambda: random.randint(0, 1 << 40)),
+        # Handshakes de plus de 10 minutes : le statut ne change pas pendant la mesure
+        vector(shuffled(public_keys), lambda: int(now - random.uniform(600, 86400))),
+        vector(shuffled(public_keys), lambda: random.uniform(0, 5_000_000)),
+        vector(shuffled(public_keys), lambda: random.uniform(0, 5_000_000))
+    )
+
+    PrometheusService.query_many = staticmethod(lambda queries: list(vectors))
+
+    nested_seconds, nested = timed(lambda: nested_loop_join(*vectors), 1)
+    fleet_seconds, fleet = timed(PrometheusService.get_fleet_metrics, args.repeat)
+
+    assert comparable(nested) == comparable(fleet), "results differ"
+    print(f"{args.series} series x 5 vectors")
+    print(f"  nested loop join       {nested_seconds * 1000:10.1f} ms")
+    print(f"  get_fleet_metrics      {fleet_seconds * 1000:10.1f} ms")
+    print(f"  speedup                {nested_seconds / fleet_seconds:10.1f}x")
+
+
+if __name__ == '__main__':
+    main()
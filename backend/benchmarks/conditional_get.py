@@ -0,0 +1,70 @@
+"""Polling load on a running backend, with and without conditional requests
+
+Each client polls the same endpoint in a loop, first always asking for the
+full response, then sending back the ETag it received (If-None-Match), the
+way the dashboard polls. Reports requests per second, latency percentiles,
+the share of 304 answers and the bytes received.
+
+    python benchmarks/conditional_get.py --url http://localhost:5000 --path /peers
+"""
+import argparse
+import statistics
+import threading
+import time
+import requests
+
+
+def poll(url, duration, conditional, results):
+    session = requests.Session()
+    etag = None
+    deadline = time.monotonic() + duration
+    while time.monotonic() < deadline:
+        headers = {'If-None-Match': etag} if conditional and etag else {}
+        start = time.perf_counter()
+        response = session.get(url, headers=headers)
+        elapsed = time.perf_counter() - start
+        if response.status_code == 200:
+            etag = response.headers.get('ETag') or etag
+        results.append((elapsed, response.status_code, len(response.content)))
+
+
+def run(url, clients, duration, conditional):
+    results = []
+    threads = [
+        threading.Thread(target=poll, args=(url, duration, conditional, results))
+        for _ in range(clients)
+    ]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return results
+
+
+def report(label, results, duration):
+    latencies = sorted(elapsed * 1000 for elapsed, _, _ in results)
+    not_modified = sum(1 for _, status, _ in results if status == 304)
+    received = sum(size for _, _, size in results)
+    print(f"{label}:")
+    print(f"  requests      {len(results)} ({len(results) / duration:.0f}/s)")
+    print(f"  latency ms    p50 {statistics.median(latencies):.2f}  "
+          f"p95 {latencies[int(len(latencies) * 0.95) - 1]:.2f}  max {latencies[-1]:.2f}")
+    print(f"  304 answers   {not_modified} ({100 * not_modified / len(results):.0f}%)")
+    print(f"  bytes         {received} ({received / len(results):.0f} per request)")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--url', default='http://localhost:5000')
+    parser.add_argument('--path', default='/peers')
+    parser.add_argument('--clients', type=int, default=8)
+    parser.add_argument('--duration', type=float, default=10, help="seconds per run")
+    args = parser.parse_args()
+
+    url = args.url.rstrip('/') + args.path
+    report("full responses", run(url, args.clients, args.duration, False), args.duration)
+    report("conditional (If-None-Match)", run(url, args.clients, args.duration, True), args.duration)
+
+
+if __name__ == '__main__':
+    main()
@@ -4,10 +4,91 @@ import os
 WIREGUARD_PATH = "/wireguard-config"
 SERVER_PUBLIC_KEY_PLACEHOLDER = "SERVER_PUBLIC_KEY_PLACEHOLDER"
 DOCKER_CONTAINER_NAME = "wireguard"
+WIREGUARD_INTERFACE = "wg0"
+# Chemin de WIREGUARD_PATH vu depuis le conteneur WireGuard
+WIREGUARD_CONTAINER_CONFIG_PATH = "/config"
+# incremental (wg set), syncconf ou restart
+WIREGUARD_APPLY_MODE = os.getenv('WIREGUARD_APPLY_MODE', 'incremental')
+# Fenêtre de regroupement des modifications avant application (secondes)
+WIREGUARD_RELOAD_WINDOW = float(os.getenv('WIREGUARD_RELOAD_WINDOW', 1))
+WIREGUARD_APPLY_WAIT_TIMEOUT = float(os.getenv('WIREGUARD_APPLY_WAIT_TIMEOUT', 30))
+# Clés pré-partagées déposées le temps d'un wg set (relatif à WIREGUARD_PATH)
+APPLY_STAGING_PATH = ".apply"
 SERVER_CONFIG_PATH = "wg_confs/wg0.conf"
 PEER_IP_RANGE = "10.0.3.0"
 PEER_IP_START = 2
+PEER_IP_PREFIX = int(os.getenv('PEER_IP_PREFIX', 24))
+# Taille maximale du bitmap de l'allocateur (sous-réseaux IPv6)
+PEER_IP_MAX_HOSTS = int(os.getenv('PEER_IP_MAX_HOSTS', 1 << 20))
+IP_ALLOCATOR_STATE_PATH = "ip_allocator.json"
+# Verrou, journal et compteur de génération du ConfigStore (relatifs à WIREGUARD_PATH)
+CONFIG_LOCK_PATH = ".config.lock"
+CONFIG_JOURNAL_PATH = ".config.journal"
+CONFIG_GENERATION_PATH = ".config.generation"
+# Stockage des peers : 'files' (un répertoire par peer) ou 'sqlite'
+PEER_STORE_BACKEND = os.getenv('PEER_STORE_BACKEND', 'files')
+PEER_STORE_DB_PATH = "peers.db"
+PEER_REGISTRY_CHECK_INTERVAL = float(os.getenv('PEER_REGISTRY_CHECK_INTERVAL', 2))
+
+# Configuration des peers (templates/peer.conf du conteneur)
+PEER_TEMPLATE_PATH = "templates/peer.conf"
+PEER_ENDPOINT_HOST = os.getenv('PEER_ENDPOINT_HOST', '192.168.88.30')
+PEER_ENDPOINT_PORT = int(os.getenv('PEER_ENDPOINT_PORT', 51820))
+PEER_DNS = os.getenv('PEER_DNS', '8.8.8.8')
+PEER_ALLOWED_IPS = os.getenv('PEER_ALLOWED_IPS', '0.0.0.0/0, 10.0.3.0/24')
+PEER_CONFIG_CACHE_SIZE = int(os.getenv('PEER_CONFIG_CACHE_SIZE', 1024))
+PEER_CONFIG_CACHE_TTL = float(os.getenv('PEER_CONFIG_CACHE_TTL', 3600))
+
+# Cache des QR codes (relatif à WIREGUARD_PATH)
+QR_CACHE_PATH = ".qr-cache"
+QR_CACHE_SIZE = int(os.getenv('QR_CACHE_SIZE', 256))
+QR_CACHE_TTL = float(os.getenv('QR_CACHE_TTL', 3600))
+QR_DISK_CACHE_MAX = int(os.getenv('QR_DISK_CACHE_MAX', 10000))
+
+# Réserve de clés générées à l'avance
+KEY_POOL_SIZE = int(os.getenv('KEY_POOL_SIZE', 256))
+KEY_POOL_LOW_WATER = int(os.getenv('KEY_POOL_LOW_WATER', 64))
+KEY_POOL_BATCH_SIZE = int(os.getenv('KEY_POOL_BATCH_SIZE', 32))
+
+# Pagination de GET /peers
+PEERS_PAGE_SIZE = int(os.getenv('PEERS_PAGE_SIZE', 50))
+PEERS_PAGE_MAX = int(os.getenv('PEERS_PAGE_MAX', 500))
+
+# Journal des modifications de peers (GET /peers/changes)
+PEER_CHANGES_BUFFER_SIZE = int(os.getenv('PEER_CHANGES_BUFFER_SIZE', 10000))
+# Variation de trafic (octets) signalée comme changement
+PEER_CHANGES_TRAFFIC_DELTA = int(os.getenv('PEER_CHANGES_TRAFFIC_DELTA', 1 << 20))
+
+# Opérations groupées sur les peers
+BULK_MAX_PEERS = int(os.getenv('BULK_MAX_PEERS', 5000))
 
 # Prometheus Configuration
 PROMETHEUS_URL = os.getenv('PROMETHEUS_URL', 'http://192.168.88.30:9090')
-PROMETHEUS_EXPORTER_URL = os.getenv('PROMETHEUS_EXPORTER_URL', 'http://192.168.88.30:9586')
\ No newline at end of file
+PROMETHEUS_EXPORTER_URL = os.getenv('PROMETHEUS_EXPORTER_URL', 'http://192.168.88.30:9586')
+PROMETHEUS_POOL_SIZE = int(os.getenv('PROMETHEUS_POOL_SIZE', 10))
+PROMETHEUS_QUERY_TIMEOUT = float(os.getenv('PROMETHEUS_QUERY_TIMEOUT', 10))
+
+# Doit correspondre au scrape_interval de prometheus.yml
+PROMETHEUS_SCRAPE_INTERVAL = int(os.getenv('PROMETHEUS_SCRAPE_INTERVAL', 5))
+PROMETHEUS_CACHE_TTL = float(os.getenv('PROMETHEUS_CACHE_TTL', PROMETHEUS_SCRAPE_INTERVAL))
+PROMETHEUS_CACHE_SIZE = int(os.getenv('PROMETHEUS_CACHE_SIZE', 512))
+
+# Collecte des métriques en arrière-plan (secondes)
+METRICS_POLL_INTERVAL = float(os.getenv('METRICS_POLL_INTERVAL', PROMETHEUS_SCRAPE_INTERVAL))
+# prometheus (PromQL), exporter (lecture directe de PROMETHEUS_EXPORTER_URL)
+# ou wg (wg show dump dans le conteneur, sans Prometheus ni exporter)
+METRICS_SOURCE = os.getenv('METRICS_SOURCE', 'prometheus')
+
+# Historique de bande passante : durée maximale et nombre de points par série
+HISTORY_MAX_HOURS = int(os.getenv('HISTORY_MAX_HOURS', 720))
+HISTORY_DEFAULT_POINTS = int(os.getenv('HISTORY_DEFAULT_POINTS', 120))
+HISTORY_MAX_POINTS = int(os.getenv('HISTORY_MAX_POINTS', 2000))
+# Résolution demandée à Prometheus avant réduction (lttb / minmax)
+HISTORY_OVERSAMPLING = int(os.getenv('HISTORY_OVERSAMPLING', 4))
+
+# Disjoncteur Prometheus
+PROMETHEUS_BREAKER_WINDOW = int(os.getenv('PROMETHEUS_BREAKER_WINDOW', 20))
+PROMETHEUS_BREAKER_MIN_CALLS = int(os.getenv('PROMETHEUS_BREAKER_MIN_CALLS', 5))
+PROMETHEUS_BREAKER_ERROR_RATE = float(os.getenv('PROMETHEUS_BREAKER_ERROR_RATE', 0.5))
+PROMETHEUS_BREAKER_BACKOFF_MIN = float(os.getenv('PROMETHEUS_BREAKER_BACKOFF_MIN', 1))
+PROMETHEUS_BREAKER_BACKOFF_MAX = float(os.getenv('PROMETHEUS_BREAKER_BACKOFF_MAX', 60))
@@ -1,5 +1,7 @@
 from flask import Blueprint, jsonify, request
+from services.metrics_store import MetricsStore
 from services.prometheus_service import PrometheusService
+from utils.helpers import parse_history_params
 
 metrics_bp = Blueprint('metrics', __name__, url_prefix='/api/metrics')
 
@@ -7,8 +9,12 @@ metrics_bp = Blueprint('metrics', __name__, url_prefix='/api/metrics')
 def get_summary():
     """Récupère le résumé global du VPN"""
     try:
-        summary = PrometheusService.get_summary()
-        return jsonify(summary), 200
+        summary = MetricsStore.summary()
+        
+        if summary is None:
+            return jsonify({'error': 'No metrics snapshot available'}), 503
+        
+        return jsonify(dict(summary, stale=MetricsStore.is_stale(), snapshot_age=MetricsStore.age())), 200
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
@@ -16,10 +22,21 @@ def get_summary():
 def get_all_peers_metrics():
     """Récupère les métriques de base pour tous les peers"""
     try:
-        peers = PrometheusService.get_all_peers_metrics()
+        peers = [
+            {
+                'public_key': public_key,
+                'name': metrics['name'],
+                'interface': metrics['stats']['interface'],
+                'allowed_ips': metrics['stats']['allowed_ips'],
+                'sent_bytes': metrics['stats']['sent_bytes']
+            }
+            for public_key, metrics in (MetricsStore.fleet() or {}).items()
+        ]
         return jsonify({
             'peers': peers,
-            'count': len(peers)
+            'count': len(peers),
+            'stale': MetricsStore.is_stale(),
+            'snapshot_age': MetricsStore.age()
         }), 200
     except Exception as e:
         return jsonify({'error': str(e)}), 500
@@ -28,10 +45,21 @@ def get_all_peers_metrics():
 def get_active_peers():
     """Récupère uniquement les peers actifs"""
     try:
-        active_peers = PrometheusService.get_active_peers()
+        active_peers = [
+            {
+                'public_key': public_key,
+                'name': metrics['name'],
+                'interface': metrics['stats']['interface'],
+                'allowed_ips': metrics['stats']['allowed_ips']
+            }
+            for public_key, metrics in (MetricsStore.fleet() or {}).items()
+            if metrics['stats']['is_active']
+        ]
         return jsonify({
             'active_peers': active_peers,
-            'count': len(active_peers)
+            'count': len(active_peers),
+            'stale': MetricsStore.is_stale(),
+            'snapshot_age': MetricsStore.age()
         }), 200
     except Exception as e:
         return jsonify({'error': str(e)}), 500
@@ -40,12 +68,15 @@ def get_active_peers():
 def get_peer_stats(public_key):
     """Récupère les statistiques complètes d'un peer spécifique"""
     try:
-        stats = PrometheusService.get_peer_stats(public_key)
+        metrics = MetricsStore.peer(public_key)
         
-        if stats is None:
+        if metrics is None:
             return jsonify({'error': 'Peer not found or no metrics available'}), 404
         
-        return jsonify(stats), 200
+        return jsonify(dict(
+            metrics['stats'], name=metrics['name'],
+            stale=MetricsStore.is_stale(), snapshot_age=MetricsStore.age()
+        )), 200
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
@@ -53,14 +84,17 @@ def get_peer_stats(public_key):
 def get_bandwidth():
     """Récupère la bande passante actuelle de tous les peers"""
     try:
-        bandwidth = PrometheusService.get_peer_bandwidth()
+        fleet = MetricsStore.fleet()
         
-        if bandwidth is None:
+        if fleet is None:
             return jsonify({'error': 'No bandwidth data available'}), 404
         
+        bandwidth = [metrics['bandwidth'] for metrics in fleet.values() if metrics['bandwidth']]
         return jsonify({
             'bandwidth': bandwidth,
-            'count': len(bandwidth) if isinstance(bandwidth, list) else 0
+            'count': len(bandwidth),
+            'stale': MetricsStore.is_stale(),
+            'snapshot_age': MetricsStore.age()
         }), 200
     except Exception as e:
         return jsonify({'error': str(e)}), 500
@@ -69,37 +103,57 @@ def get_bandwidth():
 def get_peer_bandwidth(public_key):
     """Récupère la bande passante actuelle d'un peer spécifique"""
     try:
-        bandwidth = PrometheusService.get_peer_bandwidth(public_key)
+        metrics = MetricsStore.peer(public_key)
         
-        if bandwidth is None:
+        if metrics is None or metrics['bandwidth'] is None:
             return jsonify({'error': 'Peer not found or no bandwidth data available'}), 404
         
-        return jsonify(bandwidth), 200
+        return jsonify(dict(
+            metrics['bandwidth'], stale=MetricsStore.is_stale(), snapshot_age=MetricsStore.age()
+        )), 200
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
 @metrics_bp.route('/peer/<public_key>/history', methods=['GET'])
 def get_peer_history(public_key):
-    """Récupère l'historique de bande passante d'un peer"""
+    """Récupère l'historique de bande passante d'un peer
+
+    Paramètres : hours (30 jours max), points (budget de points, dont est
+    déduit le pas), downsample (lttb|minmax) et format (points|columns ;
+    columns renvoie des tableaux parallèles compacts).
+    """
     try:
-        # Récupérer le paramètre de durée (en heures, par défaut 1)
-        duration_hours = request.args.get('hours', default=1, type=int)
+        try:
+            duration_hours, points, downsample, fmt = parse_history_params(request.args)
+        except ValueError as e:
+            return jsonify({'error': str(e)}), 400
         
-        # Limiter la durée maximale à 24 heures
-        if duration_hours > 24:
-            duration_hours = 24
-        
-        history = PrometheusService.get_peer_history(public_key, duration_hours)
+        if fmt == 'columns':
+            history = PrometheusService.get_peer_history_columns(public_key, duration_hours, points, downsample)
+        else:
+            history = PrometheusService.get_peer_history(public_key, duration_hours, points, downsample)
         
         if history is None:
             return jsonify({'error': 'Peer not found or no history available'}), 404
         
-        return jsonify({
+        response = {
             'public_key': public_key,
             'duration_hours': duration_hours,
-            'history': history,
-            'data_points': len(history)
-        }), 200
+            'stale': PrometheusService.is_stale()
+        }
+        if fmt == 'columns':
+            response.update(history, format='columns', data_points=len(history['timestamps']))
+        else:
+            response.update(history=history, data_points=len(history))
+        return jsonify(response), 200
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+@metrics_bp.route('/cache', methods=['GET'])
+def get_cache_stats():
+    """Récupère les compteurs du cache de requêtes Prometheus"""
+    try:
+        return jsonify(PrometheusService.cache_stats()), 200
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
@@ -112,7 +166,9 @@ def health_check():
         return jsonify({
             'api_status': 'up',
             'prometheus_status': 'up' if prometheus_healthy else 'down',
-            'prometheus_url': PrometheusService.query.__globals__['PROMETHEUS_URL']
+            'prometheus_url': PrometheusService.query.__globals__['PROMETHEUS_URL'],
+            'circuit': PrometheusService.breaker_status(),
+            'collector': MetricsStore.status()
         }), 200
     except Exception as e:
         return jsonify({
@@ -1,22 +1,55 @@
-from flask import jsonify, request, Blueprint
-import threading
-import os
-import shutil
-from config.settings import WIREGUARD_PATH
+from flask import jsonify, request, Blueprint, Response, stream_with_context
+import math
+import time
+from config.settings import PEERS_PAGE_SIZE, PEERS_PAGE_MAX, BULK_MAX_PEERS, WIREGUARD_APPLY_WAIT_TIMEOUT
 from services.key_service import KeyService
 from services.config_service import ConfigService
 from services.wireguard_service import WireGuardService
 from services.prometheus_service import PrometheusService  # ← Nouveau
-from utils.helpers import sanitize_peer_name, peer_exists, list_existing_peers
+from services.change_log import ChangeLog
+from services.metrics_store import MetricsStore
+from services.peer_index import PeerIndex
+from services.peer_registry import PeerRegistry
+from services.qr_service import QRService, QR_FORMATS
+from utils.helpers import sanitize_peer_name, parse_history_params
+from utils.http_cache import conditional
+from utils.zip_stream import stream_zip
 
 peers_bp = Blueprint('peers', __name__)
 
+# Query parameters that switch GET /peers to the paginated listing
+PAGINATION_PARAMS = ('limit', 'cursor', 'prefix', 'status', 'ip', 'sort', 'order')
+
+def peers_validators():
+    """State GET /peers depends on: the configuration, plus the metrics when they are used"""
+    parts = [PeerRegistry.state()]
+    if (request.args.get('metrics', 'true').lower() == 'true'
+            or request.args.get('sort', 'name') != 'name' or request.args.get('status')):
+        parts.append(MetricsStore.validator())
+    return parts
+
+def peer_validators():
+    """State GET /peer/<name> depends on: the configuration, plus the metrics when requested"""
+    parts = [PeerRegistry.state()]
+    if request.args.get('metrics', 'false').lower() == 'true':
+        parts.append(MetricsStore.validator())
+    return parts
+
 @peers_bp.route("/peers", methods=["GET"])
+@conditional(peers_validators)
 def list_peers():
-    """List all existing peers with their metrics"""
+    """List all existing peers with their metrics
+
+    With any of limit, cursor, prefix, status (active|inactive), ip (CIDR),
+    sort (name|traffic|handshake) or order (asc|desc), the list is filtered,
+    sorted and cut into pages, and metrics are only fetched for the page.
+    """
     try:
-        # Récupérer la liste des peers depuis la config
-        peers = list_existing_peers(WIREGUARD_PATH)
+        if any(param in request.args for param in PAGINATION_PARAMS):
+            return list_peers_page()
+        
+        # Récupérer la liste des peers depuis le registre en mémoire
+        peers = PeerRegistry.list_peers()
         
         # Option pour désactiver les métriques via query param
         include_metrics = request.args.get('metrics', 'true').lower() == 'true'
@@ -24,67 +57,87 @@ def list_peers():
         if not include_metrics:
             return jsonify(peers)
         
-        # Enrichir chaque peer avec ses métriques Prometheus
-        enriched_peers = []
-        for peer in peers:
-            peer_data = peer.copy()
-            
-            # Essayer de récupérer les métriques
-            try:
-                # Récupérer la clé publique du peer (à adapter selon votre structure)
-                # Vous devrez peut-être lire le fichier de config pour obtenir la clé publique
-                peer_public_key = get_peer_public_key(peer.get('name'))
-                
-                if peer_public_key:
-                    # Récupérer les stats Prometheus
-                    stats = PrometheusService.get_peer_stats(peer_public_key)
-                    bandwidth = PrometheusService.get_peer_bandwidth(peer_public_key)
-                    
-                    if stats:
-                        peer_data['metrics'] = {
-                            'status': stats['status'],
-                            'is_active': stats['is_active'],
-                            'traffic': {
-                                'sent_bytes': stats['sent_bytes'],
-                                'received_bytes': stats['received_bytes'],
-                                'total_bytes': stats['total_bytes'],
-                                'sent_mb': stats['sent_mb'],
-                                'received_mb': stats['received_mb'],
-                                'total_mb': stats['total_mb']
-                            },
-                            'last_handshake': stats['last_handshake'],
-                            'time_since_handshake': stats['time_since_handshake'],
-                            'allowed_ips': stats['allowed_ips']
-                        }
-                    
-                    if bandwidth:
-                        peer_data['bandwidth'] = {
-                            'sent_kbps': bandwidth['sent_kbps'],
-                            'recv_kbps': bandwidth['recv_kbps'],
-                            'sent_mbps': bandwidth['sent_mbps'],
-                            'recv_mbps': bandwidth['recv_mbps']
-                        }
-            except Exception as e:
-                # Si les métriques ne sont pas disponibles, continuer sans
-                print(f"Warning: Could not fetch metrics for peer {peer.get('name')}: {e}")
-                peer_data['metrics'] = None
-                peer_data['bandwidth'] = None
-            
-            enriched_peers.append(peer_data)
-        
-        # Ajouter un résumé global
-        try:
-            summary = PrometheusService.get_summary()
-        except Exception as e:
-            print(f"Warning: Could not fetch summary: {e}")
-            summary = None
+        # Métriques et résumé global tirés du dernier instantané collecté
+        enriched_peers = enrich_peers(peers, MetricsStore.fleet())
         
         return jsonify({
             'peers': enriched_peers,
             'count': len(enriched_peers),
-            'summary': summary
+            'summary': MetricsStore.summary(),
+            'stale': MetricsStore.is_stale(),
+            'snapshot_age': MetricsStore.age()
+        })
+        
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+
+
+def list_peers_page():
+    """One page of /peers, see list_peers()"""
+    try:
+        limit = int(request.args.get('limit', PEERS_PAGE_SIZE))
+        if not 1 <= limit <= PEERS_PAGE_MAX:
+            raise ValueError(f"limit must be between 1 and {PEERS_PAGE_MAX}")
+        
+        names, next_cursor, total = PeerIndex.page(
+            limit=limit,
+            cursor=request.args.get('cursor'),
+            sort=request.args.get('sort', 'name'),
+            order=request.args.get('order', 'asc'),
+            prefix=sanitize_peer_name(request.args.get('prefix', '')) or None,
+            status=request.args.get('status') or None,
+            ip_range=request.args.get('ip') or None
+        )
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    
+    peers = [{"name": name} for name in names]
+    include_metrics = request.args.get('metrics', 'true').lower() == 'true'
+    
+    summary = None
+    if include_metrics:
+        # Seuls les peers de la page sont enrichis, depuis l'instantané
+        peers = enrich_peers(peers, MetricsStore.fleet())
+        summary = MetricsStore.summary()
+    
+    return jsonify({
+        'peers': peers,
+        'count': len(peers),
+        'total': total,
+        'next_cursor': next_cursor,
+        'summary': summary,
+        'stale': MetricsStore.is_stale(),
+        'snapshot_age': MetricsStore.age()
+    })
+
+
+@peers_bp.route("/peers/changes", methods=["GET"])
+def list_peer_changes():
+    """Peer changes since a version (?since=<version>)
+
+    Events: added, updated, deleted, status (active/inactive) and traffic.
+    Without since, or when the version is too old or comes from another
+    worker, the answer has resync: true with the current version: reload
+    /peers, then poll from that version.
+    """
+    try:
+        # Prendre en compte les modifications externes (les métriques sont observées par le collecteur)
+        PeerRegistry.refresh_if_changed()
+        
+        since = request.args.get('since')
+        if since is None:
+            changes, version = None, ChangeLog.current_version()
+        else:
+            changes, version = ChangeLog.since(since)
+        
+        return jsonify({
+            'version': version,
+            'resync': changes is None,
+            'changes': changes or []
         })
         
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
     except Exception as e:
         return jsonify({"error": str(e)}), 500
 
@@ -101,21 +154,22 @@ def add_peer():
         name = sanitize_peer_name(name)
         
         # Check if peer already exists
-        if peer_exists(name, WIREGUARD_PATH):
+        if PeerRegistry.exists(name):
             return jsonify({"error": f"Peer {name} already exists"}), 400
         
-        # Generate keys
-        private_key, public_key = KeyService.generate_wireguard_keys()
-        preshared_key = KeyService.generate_preshared_key()
+        # Take pre-generated keys
+        private_key, public_key, preshared_key = KeyService.take_key_sets(1)[0]
         
-        # Add peer to server configuration and get assigned IP
-        peer_ip = WireGuardService.add_peer_to_server_config(name, public_key, preshared_key)
-        
-        # Create peer directory structure
-        ConfigService.create_peer_directory_structure(name, private_key, public_key, preshared_key, peer_ip)
-        
-        # Create the .conf file for easy download
-        ConfigService.create_peer_config_file(name, peer_ip, private_key, preshared_key)
+        # Add peer to server configuration and to the peer store in the same transaction
+        store = ConfigService.get_peer_store()
+        with store.batch():
+            peer_ip = WireGuardService.add_peer_to_server_config(
+                name, public_key, preshared_key,
+                peer_files=lambda peer_name, ip: store.peer_files(
+                    peer_name, private_key, public_key, preshared_key, ip
+                )
+            )
+        PeerRegistry.register(name, public_key, peer_ip)
         
         # Prepare response data first
         response_data = {
@@ -127,21 +181,11 @@ def add_peer():
             "directory": name
         }
         
-        # Start WireGuard restart in background thread
-        def restart_wireguard_background():
-            try:
-                restart_success, restart_message = WireGuardService.restart_wireguard_container()
-                if not restart_success:
-                    print(f"Warning: {restart_message}")
-                else:
-                    print("WireGuard container restarted successfully")
-            except Exception as e:
-                print(f"Error restarting WireGuard container: {e}")
-        
-        # Start the background thread
-        thread = threading.Thread(target=restart_wireguard_background)
-        thread.daemon = True  # This ensures the thread won't prevent program exit
-        thread.start()
+        # Schedule the new peer for the live interface (no container restart)
+        version = WireGuardService.schedule_apply(
+            added=WireGuardService.get_server_peers([name])
+        )
+        response_data.update(apply_status(version))
         
         return jsonify(response_data)
 
@@ -149,15 +193,154 @@ def add_peer():
         return jsonify({"error": str(e)}), 500
 
 
+@peers_bp.route("/peers/bulk", methods=["POST"])
+def bulk_add_peers():
+    """Create many peers with a single server config update and a single reload
+
+    Body: {"names": [...]} or {"count": N, "prefix": "office"}.
+    Results are listed in the order of the request. The whole batch is
+    committed at once, so the answer is a single JSON document rather than
+    progress events.
+    """
+    try:
+        data = request.json or {}
+        
+        # Check the size of the batch before building anything
+        if data.get("names"):
+            if not isinstance(data["names"], list):
+                return jsonify({"error": "names must be a list"}), 400
+            if len(data["names"]) > BULK_MAX_PEERS:
+                return jsonify({"error": f"At most {BULK_MAX_PEERS} peers per request"}), 400
+            names = [sanitize_peer_name(str(n)) for n in data["names"]]
+        elif "count" in data:
+            count = data["count"]
+            if isinstance(count, bool) or not isinstance(count, int) or not 1 <= count <= BULK_MAX_PEERS:
+                return jsonify({"error": f"count must be an integer between 1 and {BULK_MAX_PEERS}"}), 400
+            prefix = sanitize_peer_name(str(data.get("prefix", "peer")))
+            width = len(str(count))
+            names = [f"{prefix}-{str(i).zfill(width)}" for i in range(1, count + 1)]
+        else:
+            return jsonify({"error": "names or count required"}), 400
+        
+        # Reject empty, duplicated or existing names up front, keeping the input order
+        results = []
+        pending = {}
+        for name in names:
+            if not name:
+                results.append({"peer_name": name, "status": "error", "error": "invalid peer name"})
+            elif name in pending:
+                results.append({"peer_name": name, "status": "error", "error": f"Peer {name} appears more than once in the request"})
+            elif PeerRegistry.exists(name):
+                results.append({"peer_name": name, "status": "error", "error": f"Peer {name} already exists"})
+            else:
+                pending[name] = {"peer_name": name, "status": "pending"}
+                results.append(pending[name])
+        to_create = list(pending)
+        
+        # Take all keys in one batch
+        keys = dict(zip(to_create, KeyService.take_key_sets(len(to_create))))
+        
+        # Allocate all IPs and commit the server config and every peer at once
+        peer_ips = []
+        if to_create:
+            store = ConfigService.get_peer_store()
+            with store.batch():
+                peer_ips = WireGuardService.add_peers_to_server_config(
+                    [(name, keys[name][1], keys[name][2]) for name in to_create],
+                    peer_files=lambda name, ip: store.peer_files(name, *keys[name], ip)
+                )
+        
+        created = []
+        for name, peer_ip in zip(to_create, peer_ips):
+            private_key, public_key, preshared_key = keys[name]
+            created.append(PeerRegistry.register(name, public_key, peer_ip))
+            pending[name].update({
+                "status": "created",
+                "ip_address": peer_ip,
+                "public_key": public_key,
+                "config_file": f"{name}.conf"
+            })
+        
+        if to_create:
+            WireGuardService.schedule_apply(added=WireGuardService.get_server_peers(to_create))
+            # Prepare the QR codes the users are about to download
+            QRService.warm(created)
+        
+        return jsonify({
+            "requested": len(names),
+            "created": sum(1 for r in results if r["status"] == "created"),
+            "results": results
+        })
+    
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+
+
+@peers_bp.route("/peers/export", methods=["GET", "POST"])
+def export_peers():
+    """Stream a ZIP of <name>.conf files, optionally with QR codes
+
+    Query string (or JSON body for long lists): names (list or comma
+    separated), prefix, qr=png|svg. Without names nor prefix every peer is
+    exported. The archive is built entry by entry while it is sent.
+    """
+    try:
+        params = (request.json or {}) if request.method == "POST" else request.args
+        
+        if request.method == "POST":
+            names = params.get("names") or []
+        else:
+            names = [n for value in params.getlist("names") for n in value.split(",")]
+        prefix = sanitize_peer_name(str(params.get("prefix") or ""))
+        qr_format = (params.get("qr") or "").lower() or None
+        if qr_format is not None and qr_format not in QR_FORMATS:
+            return jsonify({"error": f"qr must be one of {', '.join(QR_FORMATS)}"}), 400
+        
+        if names:
+            selected = []
+            for name in (sanitize_peer_name(str(n)) for n in names):
+                if PeerRegistry.exists(name) and name not in selected:
+                    selected.append(name)
+        else:
+            selected = [peer["name"] for peer in PeerRegistry.list_peers()]
+        if prefix:
+            selected = [name for name in selected if name.startswith(prefix)]
+        
+        if not selected:
+            return jsonify({"error": "No peer matches the export"}), 404
+        
+        def entries():
+            for name in selected:
+                peer = PeerRegistry.get(name)
+                config = ConfigService.get_peer_config(peer) if peer is not None else None
+                if config is None:
+                    continue
+                yield f"{name}.conf", config, True
+                if qr_format:
+                    image, _ = QRService.get_qr(name, config, qr_format)
+                    yield f"{name}.{qr_format}", image, qr_format == "svg"
+        
+        return Response(
+            stream_with_context(stream_zip(entries())),
+            mimetype="application/zip",
+            headers={"Content-Disposition": 'attachment; filename="peers.zip"'}
+        )
+    
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+
+
 @peers_bp.route("/peer/<name>", methods=["GET"])
+@conditional(peer_validators)
 def get_peer_config(name):
     """Get the configuration file for a specific peer with metrics"""
     try:
         name = sanitize_peer_name(name)
-        config_path = os.path.join(WIREGUARD_PATH, f"{name}.conf")
+        peer = PeerRegistry.get(name)
         
-        with open(config_path, 'r') as f:
-            config_content = f.read()
+        config_content = ConfigService.get_peer_config(peer) if peer is not None else None
+        if config_content is None:
+            return jsonify({"error": "Peer configuration not found"}), 404
         
         response_data = {
             "peer_name": name,
@@ -169,16 +352,16 @@ def get_peer_config(name):
         
         if include_metrics:
             try:
-                peer_public_key = get_peer_public_key(name)
+                peer_public_key = PeerRegistry.get_public_key(name)
                 
                 if peer_public_key:
-                    stats = PrometheusService.get_peer_stats(peer_public_key)
-                    bandwidth = PrometheusService.get_peer_bandwidth(peer_public_key)
+                    peer_metrics = MetricsStore.peer(peer_public_key) or {}
                     history = PrometheusService.get_peer_history(peer_public_key, duration_hours=1)
                     
-                    response_data['metrics'] = stats
-                    response_data['bandwidth'] = bandwidth
+                    response_data['metrics'] = peer_metrics.get('stats')
+                    response_data['bandwidth'] = peer_metrics.get('bandwidth')
                     response_data['history'] = history
+                    response_data['snapshot_age'] = MetricsStore.age()
             except Exception as e:
                 print(f"Warning: Could not fetch metrics for peer {name}: {e}")
         
@@ -190,6 +373,30 @@ def get_peer_config(name):
         return jsonify({"error": str(e)}), 500
 
 
+@peers_bp.route("/peer/<name>/qr", methods=["GET"])
+def get_peer_qr(name):
+    """QR code of the peer configuration (?format=png|svg)"""
+    try:
+        name = sanitize_peer_name(name)
+        fmt = request.args.get("format", "png").lower()
+        if fmt not in QR_FORMATS:
+            return jsonify({"error": f"format must be one of {', '.join(QR_FORMATS)}"}), 400
+        
+        peer = PeerRegistry.get(name)
+        qr = QRService.get_peer_qr(peer, fmt) if peer is not None else None
+        if qr is None:
+            return jsonify({"error": "Peer configuration not found"}), 404
+        
+        image, digest = qr
+        response = Response(image, mimetype=QR_FORMATS[fmt])
+        response.set_etag(digest)
+        response.headers["Cache-Control"] = "private, no-transform"
+        return response.make_conditional(request)
+        
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+
+
 @peers_bp.route("/peer/<name>/metrics", methods=["GET"])
 def get_peer_metrics(name):
     """Get detailed metrics for a specific peer"""
@@ -197,25 +404,37 @@ def get_peer_metrics(name):
         name = sanitize_peer_name(name)
         
         # Vérifier que le peer existe
-        if not peer_exists(name, WIREGUARD_PATH):
+        if not PeerRegistry.exists(name):
             return jsonify({"error": f"Peer {name} not found"}), 404
         
         # Récupérer la clé publique du peer
-        peer_public_key = get_peer_public_key(name)
+        peer_public_key = PeerRegistry.get_public_key(name)
         
         if not peer_public_key:
             return jsonify({"error": "Could not retrieve peer public key"}), 500
         
-        # Récupérer les métriques
-        stats = PrometheusService.get_peer_stats(peer_public_key)
-        bandwidth = PrometheusService.get_peer_bandwidth(peer_public_key)
-        
-        # Récupérer l'historique (durée personnalisable via query param)
-        duration_hours = request.args.get('hours', default=1, type=int)
-        if duration_hours > 24:
-            duration_hours = 24
-        
-        history = PrometheusService.get_peer_history(peer_public_key, duration_hours)
+        # Paramètres de l'historique (durée, budget de points, réduction, format)
+        try:
+            duration_hours, points, downsample, fmt = parse_history_params(request.args)
+        except ValueError as e:
+            return jsonify({"error": str(e)}), 400
+        
+        # Récupérer les métriques depuis l'instantané
+        peer_metrics = MetricsStore.peer(peer_public_key) or {}
+        stats = peer_metrics.get('stats')
+        bandwidth = peer_metrics.get('bandwidth')
+        
+        if fmt == 'columns':
+            columns = PrometheusService.get_peer_history_columns(peer_public_key, duration_hours, points, downsample)
+            history = dict(columns or {}, format='columns', duration_hours=duration_hours,
+                           data_points=len(columns['timestamps']) if columns else 0)
+        else:
+            data = PrometheusService.get_peer_history(peer_public_key, duration_hours, points, downsample)
+            history = {
+                "duration_hours": duration_hours,
+                "data_points": len(data) if data else 0,
+                "data": data
+            }
         
         if not stats:
             return jsonify({"error": "No metrics available for this peer"}), 404
@@ -223,13 +442,11 @@ def get_peer_metrics(name):
         return jsonify({
             "peer_name": name,
             "public_key": peer_public_key,
+            "stale": MetricsStore.is_stale(),
+            "snapshot_age": MetricsStore.age(),
             "stats": stats,
             "bandwidth": bandwidth,
-            "history": {
-                "duration_hours": duration_hours,
-                "data_points": len(history) if history else 0,
-                "data": history
-            }
+            "history": history
         })
         
     except Exception as e:
@@ -241,40 +458,28 @@ def delete_peer(name):
     """Delete a peer configuration"""
     try:
         name = sanitize_peer_name(name)
+        if not PeerRegistry.exists(name):
+            return jsonify({"error": f"Peer {name} not found"}), 404
         
-        # Remove peer from server config first
-        success, message = WireGuardService.remove_peer_from_server_config(name)
-        if not success:
-            return jsonify({"error": message}), 500
-        
-        # Remove peer directory
-        peer_dir = os.path.join(WIREGUARD_PATH, name)
-        if os.path.exists(peer_dir):
-            shutil.rmtree(peer_dir)
-        
-        # Remove .conf file
-        config_path = os.path.join(WIREGUARD_PATH, f"{name}.conf")
-        if os.path.exists(config_path):
-            os.remove(config_path)
+        # Remove peer from server config and from the peer store in one transaction
+        store = ConfigService.get_peer_store()
+        with store.batch():
+            success, removed = WireGuardService.remove_peer_from_server_config(
+                name, peer_paths=store.peer_paths
+            )
+            if not success:
+                raise RuntimeError(removed)
+        
+        PeerRegistry.unregister(name)
+        # The cached QR codes contain the private key of the peer
+        QRService.purge([name])
 
         # Prepare response data
         response_data = {"message": f"Peer {name} deleted successfully"}
         
-        # Start WireGuard restart in background thread
-        def restart_wireguard_background():
-            try:
-                restart_success, restart_message = WireGuardService.restart_wireguard_container()
-                if not restart_success:
-                    print(f"Warning: {restart_message}")
-                else:
-                    print(f"WireGuard container restarted successfully after deleting peer {name}")
-            except Exception as e:
-                print(f"Error restarting WireGuard container: {e}")
-        
-        # Start the background thread
-        thread = threading.Thread(target=restart_wireguard_background)
-        thread.daemon = True  # This ensures the thread won't prevent program exit
-        thread.start()
+        # Schedule the removal from the live interface (no container restart)
+        version = WireGuardService.schedule_apply(removed=removed)
+        response_data.update(apply_status(version))
         
         return jsonify(response_data)
             
@@ -282,51 +487,144 @@ def delete_peer(name):
         return jsonify({"error": str(e)}), 500
 
 
-# ===== HELPER FUNCTIONS =====
+@peers_bp.route("/peers/bulk-delete", methods=["POST"])
+def bulk_delete_peers():
+    """Delete many peers with a single server config update and a single reload
 
-def get_peer_public_key(peer_name):
-    """
-    Récupère la clé publique d'un peer depuis sa configuration
-    Vous devrez adapter cette fonction selon votre structure de fichiers
+    Body: {"names": [...]} or {"idle_days": N}, plus optional "dry_run": true.
+    A peer is idle when its last handshake (or its creation, if it never
+    connected) is older than N days. Idle deletes are refused (503) while
+    the metrics snapshot is stale; a dry run still reports the selection.
     """
     try:
-        # Option 1: Lire depuis le fichier publickey-<peer>
-        public_key_path = os.path.join(WIREGUARD_PATH, peer_name, f"publickey-{peer_name}")
-        if os.path.exists(public_key_path):
-            with open(public_key_path, 'r') as f:
-                return f.read().strip()
-        
-        # Option 2: Lire depuis le fichier .conf du peer
-        peer_conf_path = os.path.join(WIREGUARD_PATH, f"{peer_name}.conf")
-        if os.path.exists(peer_conf_path):
-            with open(peer_conf_path, 'r') as f:
-                for line in f:
-                    if line.strip().startswith('PublicKey'):
-                        # Extraire la clé publique
-                        return line.split('=')[1].strip()
-        
-        # Option 3: Lire depuis le wg0.conf du serveur
-        server_conf_path = os.path.join(WIREGUARD_PATH, "wg_confs", "wg0.conf")
-        if os.path.exists(server_conf_path):
-            with open(server_conf_path, 'r') as f:
-                lines = f.readlines()
-                in_peer_section = False
-                for i, line in enumerate(lines):
-                    # Chercher le commentaire avec le nom du peer
-                    if f"# {peer_name}" in line:
-                        in_peer_section = True
-                        continue
-                    
-                    # Si on est dans la section du peer, chercher la PublicKey
-                    if in_peer_section and line.strip().startswith('PublicKey'):
-                        return line.split('=')[1].strip()
-                    
-                    # Si on atteint une nouvelle section [Peer], arrêter
-                    if in_peer_section and line.strip().startswith('[Peer]'):
-                        break
+        data = request.json or {}
+        dry_run = data.get("dry_run", False)
+        if not isinstance(dry_run, bool):
+            return jsonify({"error": "dry_run must be true or false"}), 400
+        
+        if data.get("names") is not None:
+            raw_names = data["names"]
+            if not isinstance(raw_names, list) or not all(isinstance(n, str) for n in raw_names):
+                return jsonify({"error": "names must be a list of strings"}), 400
+            if len(raw_names) > BULK_MAX_PEERS:
+                return jsonify({"error": f"At most {BULK_MAX_PEERS} peers per request"}), 400
+            names = list(dict.fromkeys(
+                name for name in map(sanitize_peer_name, raw_names) if name and PeerRegistry.exists(name)
+            ))
+        elif data.get("idle_days") is not None:
+            idle_days = data["idle_days"]
+            if (isinstance(idle_days, bool) or not isinstance(idle_days, (int, float))
+                    or not math.isfinite(idle_days) or idle_days <= 0):
+                return jsonify({"error": "idle_days must be a positive number"}), 400
+            
+            handshakes = MetricsStore.handshakes()
+            if handshakes is None:
+                return jsonify({"error": "Handshake metrics unavailable, cannot select idle peers"}), 503
+            # Un snapshot périmé ferait passer des peers actifs pour inactifs
+            if not dry_run and MetricsStore.is_stale():
+                return jsonify({"error": "Handshake metrics are stale, refusing to delete idle peers"}), 503
+            
+            cutoff = time.time() - idle_days * 86400
+            names = []
+            for peer in PeerRegistry.list_peers():
+                entry = PeerRegistry.get(peer['name'])
+                last_seen = handshakes.get(entry['public_key']) or entry['created_at']
+                if last_seen < cutoff:
+                    names.append(entry['name'])
+        else:
+            return jsonify({"error": "names or idle_days required"}), 400
+        
+        if dry_run or not names:
+            return jsonify({"dry_run": dry_run, "peers": names, "count": len(names)})
+        
+        # Remove all matching sections in one pass over the server config
+        store = ConfigService.get_peer_store()
+        with store.batch():
+            success, removed = WireGuardService.remove_peers_from_server_config(
+                names, peer_paths=store.peer_paths
+            )
+            if not success:
+                raise RuntimeError(removed)
+        
+        for name in names:
+            PeerRegistry.unregister(name)
+        QRService.purge(names)
+        
+        version = WireGuardService.schedule_apply(removed=removed)
+        
+        return jsonify(dict(
+            {"dry_run": False, "deleted": names, "count": len(names)},
+            **apply_status(version)
+        ))
+    
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+
+
+# ===== HELPER FUNCTIONS =====
+
+def enrich_peers(peers, fleet):
+    """Add the metrics of `fleet` (public_key -> stats/bandwidth) to the peers"""
+    enriched_peers = []
+    for peer in peers:
+        peer_data = peer.copy()
         
-        return None
+        try:
+            peer_public_key = PeerRegistry.get_public_key(peer.get('name'))
+            
+            if peer_public_key and fleet is not None:
+                peer_metrics = fleet.get(peer_public_key)
+                if peer_metrics:
+                    stats = peer_metrics['stats']
+                    bandwidth = peer_metrics['bandwidth']
+                else:
+                    # Aucune série pour ce peer : compteurs à zéro
+                    stats = PrometheusService.build_peer_stats(peer_public_key, 0, 0, 0, '', '')
+                    bandwidth = None
+                
+                peer_data['metrics'] = format_peer_metrics(stats)
+                
+                if bandwidth:
+                    peer_data['bandwidth'] = format_peer_bandwidth(bandwidth)
+        except Exception as e:
+            # Si les métriques ne sont pas disponibles, continuer sans
+            print(f"Warning: Could not fetch metrics for peer {peer.get('name')}: {e}")
+            peer_data['metrics'] = None
+            peer_data['bandwidth'] = None
         
-    except Exception as e:
-        print(f"Error getting public key for peer {peer_name}: {e}")
-        return None
\ No newline at end of file
+        enriched_peers.append(peer_data)
+    return enriched_peers
+
+def apply_status(version):
+    """Describe a scheduled apply, waiting for it when the request has ?wait=true"""
+    status = {"config_version": version}
+    if request.args.get("wait", "false").lower() == "true":
+        status["applied"] = WireGuardService.wait_applied(version, timeout=WIREGUARD_APPLY_WAIT_TIMEOUT)
+    return status
+
+def format_peer_metrics(stats):
+    """Format the stats of a peer for the /peers listing"""
+    return {
+        'status': stats['status'],
+        'is_active': stats['is_active'],
+        'traffic': {
+            'sent_bytes': stats['sent_bytes'],
+            'received_bytes': stats['received_bytes'],
+            'total_bytes': stats['total_bytes'],
+            'sent_mb': stats['sent_mb'],
+            'received_mb': stats['received_mb'],
+            'total_mb': stats['total_mb']
+        },
+        'last_handshake': stats['last_handshake'],
+        'time_since_handshake': stats['time_since_handshake'],
+        'allowed_ips': stats['allowed_ips']
+    }
+
+def format_peer_bandwidth(bandwidth):
+    """Format the bandwidth of a peer for the /peers listing"""
+    return {
+        'sent_kbps': bandwidth['sent_kbps'],
+        'recv_kbps': bandwidth['recv_kbps'],
+        'sent_mbps': bandwidth['sent_mbps'],
+        'recv_mbps': bandwidth['recv_mbps']
+    }
@@ -2,7 +2,8 @@ from flask import jsonify, Blueprint
 import os
 from config.settings import WIREGUARD_PATH
 from services.config_service import ConfigService
-from utils.helpers import list_existing_peers
+from services.peer_registry import PeerRegistry
+from utils.http_cache import conditional
 
 server_bp = Blueprint('server', __name__)
 
@@ -11,6 +12,7 @@ def home():
     return jsonify({"status": "Backend OK", "wireguard_config": WIREGUARD_PATH})
 
 @server_bp.route("/server-info", methods=["GET"])
+@conditional(lambda: [PeerRegistry.state()])
 def server_info():
     """Check server configuration and public key"""
     try:
@@ -23,7 +25,7 @@ def server_info():
         server_public_key = ConfigService.get_server_public_key()
         
         # Count existing peers
-        existing_peers = len(list_existing_peers(WIREGUARD_PATH))
+        existing_peers = PeerRegistry.count()
         
         return jsonify({
             "server_public_key": server_public_key,
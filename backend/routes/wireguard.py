@@ -1,4 +1,5 @@
 from flask import jsonify, Blueprint
+from services.key_service import KeyService
 from services.wireguard_service import WireGuardService
 
 wireguard_bp = Blueprint('wireguard', __name__)
@@ -10,4 +11,20 @@ def reload_wireguard():
     if success:
         return jsonify({"message": message})
     else:
-        return jsonify({"error": message}), 500
\ No newline at end of file
+        return jsonify({"error": message}), 500
+
+@wireguard_bp.route("/wireguard/status", methods=["GET"])
+def reload_status():
+    """State of the pending configuration changes"""
+    try:
+        return jsonify(WireGuardService.reload_status())
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+
+@wireguard_bp.route("/wireguard/key-pool", methods=["GET"])
+def key_pool_status():
+    """Depth and refill statistics of the pre-generated key pool"""
+    try:
+        return jsonify(KeyService.key_pool_status())
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
@@ -0,0 +1,102 @@
+import os
+import threading
+import time
+from collections import deque
+from config.settings import PEER_CHANGES_BUFFER_SIZE, PEER_CHANGES_TRAFFIC_DELTA
+
+class ChangeLog:
+    """Bounded log of the peer changes seen by this process
+
+    Every event gets the next version number. Versions are given to clients
+    as "<log id>:<number>", the log id being random per process: a version
+    from another worker or from before a restart, or one older than the
+    oldest event kept, cannot be answered with deltas and asks the client
+    for a full resync.
+    """
+    _log_id = os.urandom(4).hex()
+    _events = deque(maxlen=PEER_CHANGES_BUFFER_SIZE)
+    _version = 0
+    _lock = threading.Lock()
+
+    # Derniers états observés dans les métriques : public key -> (actif, octets signalés)
+    _observed = {}
+    _observe_lock = threading.Lock()
+
+    @staticmethod
+    def record(kind, name, **data):
+        """Append an event (added, updated, deleted, status, traffic), return its version"""
+        with ChangeLog._lock:
+            ChangeLog._version += 1
+            ChangeLog._events.append(dict(
+                data, version=ChangeLog._version, type=kind, name=name, time=time.time()
+            ))
+            return ChangeLog._version
+
+    @staticmethod
+    def current_version():
+        return f"{ChangeLog._log_id}:{ChangeLog._version}"
+
+    @staticmethod
+    def since(version):
+        """Return (events newer than `version`, current version), or (None, current version) for a resync
+
+        Raises ValueError if `version` is not a version string.
+        """
+        log_id, _, number = (version or '').partition(':')
+        if not number.isdigit():
+            raise ValueError("since must be a version returned by /peers/changes")
+        number = int(number)
+
+        with ChangeLog._lock:
+            current = f"{ChangeLog._log_id}:{ChangeLog._version}"
+            oldest = ChangeLog._events[0]['version'] if ChangeLog._events else ChangeLog._version + 1
+            if log_id != ChangeLog._log_id or number > ChangeLog._version or number < oldest - 1:
+                return None, current
+            # Les versions sont contiguës : les événements voulus sont les derniers du buffer
+            events = [ChangeLog._events[-index] for index in range(ChangeLog._version - number, 0, -1)]
+        return [dict(event, version=f"{log_id}:{event['version']}") for event in events], current
+
+    @staticmethod
+    def record_peers_diff(old_peers, new_peers):
+        """Record the differences between two registry indexes (name -> entry)"""
+        for name in sorted(old_peers.keys() - new_peers.keys()):
+            ChangeLog.record('deleted', name)
+        for name in sorted(new_peers):
+            old, new = old_peers.get(name), new_peers[name]
+            if old is None:
+                ChangeLog.record('added', name, public_key=new['public_key'], allowed_ip=new['allowed_ip'])
+            elif (old['public_key'], old['allowed_ip']) != (new['public_key'], new['allowed_ip']):
+                ChangeLog.record('updated', name, public_key=new['public_key'], allowed_ip=new['allowed_ip'])
+
+    @staticmethod
+    def observe_metrics(sort_keys, name_of, active_after):
+        """Record status flips and traffic changes from a fresh set of sort keys
+
+        `sort_keys` maps a public key to (total bytes, last handshake),
+        `name_of(public_key)` gives the peer name and a peer is active when
+        its last handshake is after `active_after`. The first observation of
+        a peer only sets its baseline.
+        """
+        with ChangeLog._observe_lock:
+            ChangeLog._observe(sort_keys, name_of, active_after)
+
+    # ===== HELPERS =====
+
+    @staticmethod
+    def _observe(sort_keys, name_of, active_after):
+        observed = {}
+        for public_key, (total_bytes, handshake) in sort_keys.items():
+            name = name_of(public_key)
+            if name is None:
+                continue
+            active = handshake > active_after
+            previous = ChangeLog._observed.get(public_key)
+            reported = total_bytes if previous is None else previous[1]
+
+            if previous is not None and previous[0] != active:
+                ChangeLog.record('status', name, status='active' if active else 'inactive')
+            if abs(total_bytes - reported) >= PEER_CHANGES_TRAFFIC_DELTA:
+                ChangeLog.record('traffic', name, total_bytes=total_bytes)
+                reported = total_bytes
+            observed[public_key] = (active, reported)
+        ChangeLog._observed = observed
@@ -1,7 +1,21 @@
 import os
-from config.settings import WIREGUARD_PATH
+from config.settings import (
+    WIREGUARD_PATH, PEER_STORE_BACKEND, PEER_STORE_DB_PATH, PEER_DNS,
+    PEER_CONFIG_CACHE_TTL, PEER_CONFIG_CACHE_SIZE
+)
+from services.peer_store import FilePeerStore, SQLitePeerStore
+from services.peer_template import PeerConfigTemplate
+from services.wireguard_service import WireGuardService
+from utils.cache import TTLCache
 
 class ConfigService:
+    # Stockage des peers ('files' ou 'sqlite'), créé à la première utilisation
+    _peer_store = None
+
+    # templates/peer.conf compilé et configurations déjà rendues
+    _template = PeerConfigTemplate()
+    _config_cache = TTLCache(PEER_CONFIG_CACHE_TTL, PEER_CONFIG_CACHE_SIZE)
+
     @staticmethod
     def get_server_public_key():
         """Extract server public key from the publickey-server file"""
@@ -20,65 +34,67 @@ class ConfigService:
             return "SERVER_PUBLIC_KEY_PLACEHOLDER"
 
     @staticmethod
-    def create_peer_directory_structure(peer_name, private_key, public_key, preshared_key, peer_ip):
-        """Create the same directory structure as the WireGuard container expects"""
-        try:
-            # Create peer directory
-            peer_dir = os.path.join(WIREGUARD_PATH, peer_name)
-            os.makedirs(peer_dir, exist_ok=True)
-            
-            # Create key files
-            with open(os.path.join(peer_dir, f"privatekey-{peer_name}"), "w") as f:
-                f.write(private_key)
-            
-            with open(os.path.join(peer_dir, f"publickey-{peer_name}"), "w") as f:
-                f.write(public_key)
-            
-            with open(os.path.join(peer_dir, f"presharedkey-{peer_name}"), "w") as f:
-                f.write(preshared_key)
-            
-            # Create peer.conf using the same template structure
-            server_public_key = ConfigService.get_server_public_key()
-            peer_config = f"""[Interface]
-Address = {peer_ip}
-PrivateKey = {private_key}
-ListenPort = 51820
+    def render_peer_files(peer_name, private_key, public_key, preshared_key, peer_ip):
+        """Return {path: content} for every file of a peer, to be committed through ConfigStore"""
+        peer_dir = os.path.join(WIREGUARD_PATH, peer_name)
+        template = ConfigService._template
+        
+        return {
+            os.path.join(peer_dir, f"privatekey-{peer_name}"): private_key,
+            os.path.join(peer_dir, f"publickey-{peer_name}"): public_key,
+            os.path.join(peer_dir, f"presharedkey-{peer_name}"): preshared_key,
+            # peer.conf using the template of the container
+            os.path.join(peer_dir, "peer.conf"): template.render(
+                peer_name, peer_ip, private_key, public_key, preshared_key
+            ),
+            # .conf file for easy download
+            os.path.join(WIREGUARD_PATH, f"{peer_name}.conf"): template.render(
+                peer_name, peer_ip, private_key, public_key, preshared_key, dns=PEER_DNS
+            )
+        }
 
-[Peer]
-PublicKey = {server_public_key}
-PresharedKey = {preshared_key}
-Endpoint = 192.168.88.30:51820
-AllowedIPs = 0.0.0.0/0, 10.0.3.0/24
-"""
-            
-            with open(os.path.join(peer_dir, "peer.conf"), "w") as f:
-                f.write(peer_config)
-            
-            return peer_dir
-            
-        except Exception as e:
-            print(f"Error creating peer directory: {e}")
-            raise
+    @staticmethod
+    def get_peer_store():
+        """Return the configured peer storage backend"""
+        if ConfigService._peer_store is None:
+            file_store = FilePeerStore(ConfigService.render_peer_files)
+            if PEER_STORE_BACKEND == 'sqlite':
+                store = SQLitePeerStore(os.path.join(WIREGUARD_PATH, PEER_STORE_DB_PATH), ConfigService.render_peer_files)
+                if not store.is_migrated():
+                    # Première ouverture (ou import interrompu) : importer l'arborescence existante
+                    server_peers = {
+                        peer['name']: (peer['public_key'], peer['allowed_ips'])
+                        for peer in WireGuardService.get_server_peers()
+                    }
+                    imported = store.migrate_from(file_store, server_peers)
+                    print(f"Imported {imported} peers into {PEER_STORE_DB_PATH}")
+                ConfigService._peer_store = store
+            else:
+                ConfigService._peer_store = file_store
+        return ConfigService._peer_store
 
     @staticmethod
-    def create_peer_config_file(peer_name, peer_ip, private_key, preshared_key):
-        """Create the .conf file for easy download"""
-        server_public_key = ConfigService.get_server_public_key()
-        peer_config_content = f"""[Interface]
-Address = {peer_ip}
-PrivateKey = {private_key}
-ListenPort = 51820
-DNS = 8.8.8.8
+    def get_peer_config(peer):
+        """Downloadable .conf of a peer (registry entry), rendered once then served from the cache"""
+        key = (peer['name'], peer['public_key'], peer['allowed_ip'], ConfigService._template.check())
+        return ConfigService._config_cache.get_or_load(
+            key, lambda: ConfigService._load_peer_config(peer), cacheable=lambda config: config is not None
+        )
 
-[Peer]
-PublicKey = {server_public_key}
-PresharedKey = {preshared_key}
-Endpoint = 192.168.88.30:51820
-AllowedIPs = 0.0.0.0/0, 10.0.3.0/24
-"""
-        
-        conf_file_path = os.path.join(WIREGUARD_PATH, f"{peer_name}.conf")
-        with open(conf_file_path, "w") as f:
-            f.write(peer_config_content)
-        
-        return conf_file_path
\ No newline at end of file
+    @staticmethod
+    def get_template_signature():
+        """mtimes of the files the rendered configurations depend on"""
+        return ConfigService._template.signature()
+
+    # ===== HELPERS =====
+
+    @staticmethod
+    def _load_peer_config(peer):
+        store = ConfigService.get_peer_store()
+        private_key, public_key, preshared_key = store.read_keys(peer['name'])
+        if not private_key or not peer['allowed_ip']:
+            # Clés absentes (peer créé hors de l'API) : servir le fichier existant
+            return store.get_config(peer['name'])
+        return ConfigService._template.render(
+            peer['name'], peer['allowed_ip'], private_key, public_key, preshared_key, dns=PEER_DNS
+        )
@@ -0,0 +1,142 @@
+import fcntl
+import json
+import os
+import shutil
+import threading
+from contextlib import contextmanager
+from config.settings import WIREGUARD_PATH, CONFIG_LOCK_PATH, CONFIG_JOURNAL_PATH, CONFIG_GENERATION_PATH
+
+class ConfigStore:
+    """Crash-safe, multi-process safe persistence of the WireGuard configuration files
+
+    Every mutation runs inside transaction(), which holds a thread lock and an
+    exclusive flock shared by all the workers. commit() first writes a journal
+    describing every file to write or delete, then applies it with atomic
+    writes, bumps the generation counter and removes the journal. A journal
+    left behind by a crash is replayed (rolled forward) before the next
+    transaction or at startup; a journal that was not fully written is
+    discarded, since nothing was applied yet.
+    """
+    _thread_lock = threading.RLock()
+    _local = threading.local()
+
+    @staticmethod
+    @contextmanager
+    def transaction():
+        """Hold the configuration lock (re-entrant within a thread)"""
+        with ConfigStore._thread_lock:
+            depth = getattr(ConfigStore._local, 'depth', 0)
+            if depth:
+                ConfigStore._local.depth = depth + 1
+                try:
+                    yield
+                finally:
+                    ConfigStore._local.depth = depth
+                return
+
+            with open(os.path.join(WIREGUARD_PATH, CONFIG_LOCK_PATH), 'a') as lock_file:
+                fcntl.flock(lock_file, fcntl.LOCK_EX)
+                ConfigStore._local.depth = 1
+                try:
+                    ConfigStore._recover_locked()
+                    yield
+                finally:
+                    ConfigStore._local.depth = 0
+                    fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+    @staticmethod
+    def commit(writes=None, deletes=None):
+        """Journal then apply a set of file writes ({path: content}) and deletions
+
+        Must be called inside transaction(). Returns the new generation.
+        """
+        generation = ConfigStore.generation() + 1
+        journal = {
+            'generation': generation,
+            'writes': writes or {},
+            'deletes': list(deletes or [])
+        }
+        journal_path = os.path.join(WIREGUARD_PATH, CONFIG_JOURNAL_PATH)
+        ConfigStore.atomic_write(journal_path, json.dumps(journal), mode=0o600)
+
+        ConfigStore._apply(journal)
+        os.remove(journal_path)
+        return generation
+
+    @staticmethod
+    def generation():
+        """Monotonic counter bumped by every committed change"""
+        try:
+            with open(os.path.join(WIREGUARD_PATH, CONFIG_GENERATION_PATH), 'r') as f:
+                return int(f.read().strip() or 0)
+        except (FileNotFoundError, ValueError):
+            return 0
+
+    @staticmethod
+    def recover():
+        """Replay or discard a journal left by an interrupted commit"""
+        with ConfigStore.transaction():
+            pass
+
+    @staticmethod
+    def atomic_write(path, content, mode=None):
+        """Write a file (str or bytes) through a fsynced temporary file and an atomic rename"""
+        directory = os.path.dirname(path)
+        os.makedirs(directory, exist_ok=True)
+        tmp_path = f"{path}.tmp"
+
+        with open(tmp_path, 'wb' if isinstance(content, bytes) else 'w') as f:
+            if mode is not None:
+                os.chmod(tmp_path, mode)
+            f.write(content)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, path)
+        ConfigStore._fsync_directory(directory)
+
+    # ===== HELPERS =====
+
+    @staticmethod
+    def _apply(journal):
+        for path, content in journal['writes'].items():
+            ConfigStore.atomic_write(path, content)
+
+        for path in journal['deletes']:
+            if os.path.isdir(path):
+                shutil.rmtree(path)
+            elif os.path.exists(path):
+                os.remove(path)
+
+        ConfigStore.atomic_write(
+            os.path.join(WIREGUARD_PATH, CONFIG_GENERATION_PATH), str(journal['generation'])
+        )
+
+    @staticmethod
+    def _recover_locked():
+        journal_path = os.path.join(WIREGUARD_PATH, CONFIG_JOURNAL_PATH)
+        if not os.path.exists(journal_path):
+            return
+
+        try:
+            with open(journal_path, 'r') as f:
+                journal = json.load(f)
+        except ValueError:
+            # Journal incomplet : le commit n'avait encore rien appliqué
+            print("Discarding incomplete configuration journal")
+            os.remove(journal_path)
+            return
+
+        print(f"Replaying configuration journal (generation {journal['generation']})")
+        ConfigStore._apply(journal)
+        os.remove(journal_path)
+
+    @staticmethod
+    def _fsync_directory(directory):
+        try:
+            fd = os.open(directory, os.O_RDONLY)
+        except OSError:
+            return
+        try:
+            os.fsync(fd)
+        finally:
+            os.close(fd)
@@ -0,0 +1,110 @@
+import time
+import requests
+from config.settings import PROMETHEUS_EXPORTER_URL, PROMETHEUS_QUERY_TIMEOUT
+from services.prometheus_service import PrometheusService
+from utils.rates import CounterRates
+
+# Séries lues dans l'exposition texte -> position dans la ligne accumulée par peer
+SERIES = {
+    'wireguard_sent_bytes_total': 0,
+    'wireguard_received_bytes_total': 1,
+    'wireguard_latest_handshake_seconds': 2
+}
+
+class ExporterService:
+    """Live peer metrics scraped straight from the WireGuard exporter
+
+    Same interface as PrometheusService for the metrics collector
+    (get_fleet_metrics, is_stale), without going through the Prometheus
+    TSDB. The text exposition is parsed line by line while it streams in,
+    keeping one small list per peer, and rates are computed from the
+    counters of two consecutive scrapes.
+    """
+    _session = requests.Session()
+    _rates = CounterRates()
+    _last_error = None
+
+    @staticmethod
+    def get_fleet_metrics():
+        """Return public_key -> {'stats': ..., 'bandwidth': ...}, or None if the exporter did not answer"""
+        scraped_at, peers = ExporterService.scrape()
+        if peers is None:
+            return None
+
+        rates = ExporterService._rates.update(
+            scraped_at, {key: (peer[0], peer[1]) for key, peer in peers.items()}
+        )
+
+        fleet = {}
+        for public_key, (sent, received, handshake, interface, allowed_ips) in peers.items():
+            fleet[public_key] = {
+                'stats': PrometheusService.build_peer_stats(
+                    public_key, int(sent), int(received), int(handshake), interface, allowed_ips
+                ),
+                'bandwidth': None
+            }
+            if public_key in rates:
+                fleet[public_key]['bandwidth'] = PrometheusService.build_bandwidth(public_key, *rates[public_key])
+        return fleet
+
+    @staticmethod
+    def scrape():
+        """Return (scrape time, {public_key: [sent, received, handshake, interface, allowed_ips]})
+
+        The peers dict is None when the exporter could not be reached.
+        """
+        try:
+            with ExporterService._session.get(
+                f"{PROMETHEUS_EXPORTER_URL}/metrics", stream=True, timeout=PROMETHEUS_QUERY_TIMEOUT
+            ) as response:
+                response.raise_for_status()
+                peers = ExporterService.parse(response.iter_lines(chunk_size=65536))
+            ExporterService._last_error = None
+            return time.time(), peers
+        except (requests.exceptions.RequestException, ValueError) as e:
+            print(f"Error scraping WireGuard exporter: {e}")
+            ExporterService._last_error = str(e)
+            return time.time(), None
+
+    @staticmethod
+    def parse(lines):
+        """Parse exposition lines (bytes) into {public_key: [sent, received, handshake, interface, allowed_ips]}"""
+        peers = {}
+        for line in lines:
+            if not line or line[0] == 35:  # '#' : HELP / TYPE
+                continue
+            line = line.decode('utf-8')
+            brace = line.find('{')
+            if brace < 0 or line[:brace] not in SERIES:
+                continue
+            end = line.rfind('}')
+            labels = line[brace + 1:end]
+
+            public_key = ExporterService._label(labels, 'public_key')
+            peer = peers.get(public_key)
+            if peer is None:
+                peer = [0, 0, 0, ExporterService._label(labels, 'interface'), ExporterService._label(labels, 'allowed_ips')]
+                peers[public_key] = peer
+            # Valeur, éventuellement suivie d'un horodatage
+            peer[SERIES[line[:brace]]] = float(line[end + 1:].split()[0])
+        return peers
+
+    @staticmethod
+    def is_stale():
+        """True when the last scrape failed"""
+        return ExporterService._last_error is not None
+
+    # ===== HELPERS =====
+
+    @staticmethod
+    def _label(labels, name):
+        """Value of one label in 'a="x",b="y"', without splitting the whole list"""
+        start = labels.find(f'{name}="')
+        if start < 0:
+            return ''
+        start += len(name) + 2
+        end = labels.find('"', start)
+        # Guillemet échappé dans la valeur (rare) : chercher le suivant
+        while end > 0 and labels[end - 1] == '\\':
+            end = labels.find('"', end + 1)
+        return labels[start:end].replace('\\"', '"').replace('\\\\', '\\')
@@ -0,0 +1,134 @@
+import base64
+import ipaddress
+import json
+import os
+
+class IPAllocator:
+    """Peer address allocator backed by a bitmap of the peer subnet
+
+    Bit `i` of the bitmap is set when `network[i]` is in use. Free addresses
+    are handed out from a stack of released offsets first, then by advancing
+    a cursor over never-used offsets, so allocate() and release() are O(1)
+    amortized. For very large subnets (IPv6) the bitmap only covers the first
+    `max_hosts` addresses.
+    """
+
+    def __init__(self, network, start=2, max_hosts=1 << 20):
+        self.network = ipaddress.ip_network(network, strict=False)
+        self.start = start
+        self.size = min(self.network.num_addresses, max_hosts)
+        self.bitmap = bytearray((self.size + 7) // 8)
+        self.cursor = start
+        self.free = []
+        self.config_mtime = None
+
+        # Adresses réservées : réseau, serveur (< start) et broadcast IPv4
+        for offset in range(min(start, self.size)):
+            self._set(offset)
+        if self.network.version == 4 and self.size == self.network.num_addresses:
+            self._set(self.size - 1)
+
+    def allocate(self):
+        """Return the next free address, raise RuntimeError when the subnet is full"""
+        while self.free:
+            offset = self.free.pop()
+            if not self._is_set(offset):
+                self._set(offset)
+                return self.network[offset]
+
+        while self.cursor < self.size:
+            byte_index = self.cursor >> 3
+            if self.bitmap[byte_index] == 0xFF:
+                # Octet plein : passer directement au suivant
+                self.cursor = (byte_index + 1) << 3
+                continue
+            offset = self.cursor
+            self.cursor += 1
+            if not self._is_set(offset):
+                self._set(offset)
+                return self.network[offset]
+
+        raise RuntimeError(f"No free IP address left in {self.network}")
+
+    def reserve(self, ip):
+        """Mark an address as used, return False if it is outside of the bitmap"""
+        offset = self._offset(ip)
+        if offset is None:
+            return False
+        self._set(offset)
+        return True
+
+    def release(self, ip):
+        """Give an address back to the pool"""
+        offset = self._offset(ip)
+        if offset is None or offset < self.start or not self._is_set(offset):
+            return
+        self.bitmap[offset >> 3] &= ~(1 << (offset & 7)) & 0xFF
+        if offset < self.cursor:
+            self.free.append(offset)
+
+    def is_allocated(self, ip):
+        offset = self._offset(ip)
+        return offset is not None and self._is_set(offset)
+
+    @staticmethod
+    def from_server_config(server_config, network, start=2, max_hosts=1 << 20):
+        """Rebuild the allocator from the AllowedIPs of the [Peer] sections"""
+        allocator = IPAllocator(network, start, max_hosts)
+        for peer in server_config.peers():
+            for allowed_ip in (peer['allowed_ips'] or '').split(','):
+                if allowed_ip.strip():
+                    allocator.reserve(allowed_ip.strip().split('/')[0])
+        return allocator
+
+    def save(self, path):
+        """Persist the allocator state next to the configuration"""
+        state = {
+            'network': str(self.network),
+            'start': self.start,
+            'size': self.size,
+            'cursor': self.cursor,
+            'free': self.free,
+            'config_mtime': self.config_mtime,
+            'bitmap': base64.b64encode(bytes(self.bitmap)).decode('ascii')
+        }
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, 'w') as f:
+            json.dump(state, f)
+        os.replace(tmp_path, path)
+
+    @staticmethod
+    def load(path, network, start=2, max_hosts=1 << 20):
+        """Load a saved state, return None if it is missing or was built for another subnet"""
+        try:
+            with open(path, 'r') as f:
+                state = json.load(f)
+        except (FileNotFoundError, ValueError):
+            return None
+
+        allocator = IPAllocator(network, start, max_hosts)
+        if (state.get('network') != str(allocator.network) or state.get('start') != start
+                or state.get('size') != allocator.size):
+            return None
+
+        allocator.bitmap = bytearray(base64.b64decode(state['bitmap']))
+        allocator.cursor = state['cursor']
+        allocator.free = state['free']
+        allocator.config_mtime = state.get('config_mtime')
+        return allocator
+
+    def _offset(self, ip):
+        try:
+            ip = ipaddress.ip_address(str(ip).split('/')[0])
+        except ValueError:
+            return None
+        if ip.version != self.network.version or ip not in self.network:
+            return None
+        offset = int(ip) - int(self.network.network_address)
+        return offset if offset < self.size else None
+
+    def _is_set(self, offset):
+        return bool(self.bitmap[offset >> 3] & (1 << (offset & 7)))
+
+    def _set(self, offset):
+        self.bitmap[offset >> 3] |= 1 << (offset & 7)
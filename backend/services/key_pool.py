@@ -0,0 +1,105 @@
+import threading
+import time
+from collections import deque
+
+class KeyPool:
+    """Bounded pool of pre-generated key material, refilled in the background
+
+    `generate(count)` must return a list of `count` items. take() serves
+    items from the pool and generates the missing ones inline when the pool
+    runs empty, so callers always get what they asked for. A background
+    worker tops the pool back up to `size` whenever it falls below
+    `low_water`, `batch_size` items at a time.
+    """
+
+    def __init__(self, generate, size=256, low_water=64, batch_size=32, name='keys'):
+        self.generate = generate
+        self.size = size
+        self.low_water = min(low_water, size)
+        self.batch_size = max(1, batch_size)
+        self.name = name
+        self.hits = 0
+        self.misses = 0
+        self.refills = 0
+        self.refilled_items = 0
+        self.refill_seconds = 0.0
+        self.last_refill_seconds = None
+        self.last_error = None
+        self._items = deque()
+        self._condition = threading.Condition()
+        self._worker = None
+
+    def start(self):
+        """Start filling the pool in the background"""
+        with self._condition:
+            self._ensure_worker()
+            self._condition.notify_all()
+
+    def take(self, count=1):
+        """Return `count` items, from the pool first then generated inline"""
+        with self._condition:
+            taken = [self._items.popleft() for _ in range(min(count, len(self._items)))]
+            self.hits += len(taken)
+            self.misses += count - len(taken)
+            if len(self._items) < self.low_water:
+                self._ensure_worker()
+                self._condition.notify_all()
+
+        if len(taken) < count:
+            # Pool vide : ne pas attendre le worker, générer directement le reste
+            taken.extend(self.generate(count - len(taken)))
+        return taken
+
+    def status(self):
+        with self._condition:
+            return {
+                'name': self.name,
+                'depth': len(self._items),
+                'size': self.size,
+                'low_water': self.low_water,
+                'hits': self.hits,
+                'misses': self.misses,
+                'refills': self.refills,
+                'last_refill_seconds': self.last_refill_seconds,
+                'avg_refill_ms_per_item': (
+                    round(self.refill_seconds * 1000 / self.refilled_items, 3)
+                    if self.refilled_items else None
+                ),
+                'last_error': self.last_error
+            }
+
+    def _ensure_worker(self):
+        if self._worker is None or not self._worker.is_alive():
+            self._worker = threading.Thread(target=self._run, name=f'key-pool-{self.name}')
+            self._worker.daemon = True
+            self._worker.start()
+
+    def _run(self):
+        while True:
+            with self._condition:
+                while len(self._items) >= self.low_water:
+                    self._condition.wait()
+                missing = self.size - len(self._items)
+
+            while missing > 0:
+                count = min(self.batch_size, missing)
+                started = time.monotonic()
+                try:
+                    items = self.generate(count)
+                except Exception as e:
+                    with self._condition:
+                        self.last_error = str(e)
+                    time.sleep(1)
+                    break
+                elapsed = time.monotonic() - started
+
+                with self._condition:
+                    # take() a pu consommer pendant la génération : ne jamais dépasser `size`
+                    room = self.size - len(self._items)
+                    self._items.extend(items[:room])
+                    self.refills += 1
+                    self.refilled_items += len(items)
+                    self.refill_seconds += elapsed
+                    self.last_refill_seconds = round(elapsed, 6)
+                    self.last_error = None
+                    missing = self.size - len(self._items)
@@ -1,8 +1,17 @@
 import base64
+import os
 from cryptography.hazmat.primitives.asymmetric import x25519
 from cryptography.hazmat.primitives import serialization
+from config.settings import KEY_POOL_SIZE, KEY_POOL_LOW_WATER, KEY_POOL_BATCH_SIZE
+from services.key_pool import KeyPool
 
 class KeyService:
+    # Jeux de clés (privée, publique, pré-partagée) générés à l'avance
+    _pool = KeyPool(
+        lambda count: KeyService.generate_key_sets(count),
+        KEY_POOL_SIZE, KEY_POOL_LOW_WATER, KEY_POOL_BATCH_SIZE, name='wireguard'
+    )
+
     @staticmethod
     def generate_wireguard_keys():
         """Generate WireGuard private and public keys"""
@@ -27,11 +36,28 @@ class KeyService:
 
     @staticmethod
     def generate_preshared_key():
-        """Generate a preshared key (symmetric)"""
-        psk = x25519.X25519PrivateKey.generate()
-        psk_bytes = psk.private_bytes(
-            encoding=serialization.Encoding.Raw,
-            format=serialization.PrivateFormat.Raw,
-            encryption_algorithm=serialization.NoEncryption()
-        )
-        return base64.b64encode(psk_bytes).decode('utf-8')
\ No newline at end of file
+        """Generate a preshared key (32 random bytes, like `wg genpsk`)"""
+        return base64.b64encode(os.urandom(32)).decode('utf-8')
+
+    @staticmethod
+    def generate_key_sets(count):
+        """Generate `count` (private key, public key, preshared key) tuples"""
+        key_sets = []
+        for _ in range(count):
+            private_key, public_key = KeyService.generate_wireguard_keys()
+            key_sets.append((private_key, public_key, KeyService.generate_preshared_key()))
+        return key_sets
+
+    @staticmethod
+    def take_key_sets(count=1):
+        """Return `count` key sets from the pool, generating inline when it is empty"""
+        return KeyService._pool.take(count)
+
+    @staticmethod
+    def start_key_pool():
+        """Fill the key pool in the background"""
+        KeyService._pool.start()
+
+    @staticmethod
+    def key_pool_status():
+        return KeyService._pool.status()
@@ -0,0 +1,182 @@
+import threading
+import time
+from config.settings import METRICS_POLL_INTERVAL, METRICS_SOURCE
+from services.change_log import ChangeLog
+from services.exporter_service import ExporterService
+from services.peer_registry import PeerRegistry
+from services.prometheus_service import PrometheusService
+from services.wg_dump_service import WgDumpService
+
+ACTIVE_HANDSHAKE_SECONDS = 180
+
+# Sources possibles : get_fleet_metrics() et is_stale()
+METRICS_SOURCES = {
+    'prometheus': PrometheusService,
+    'exporter': ExporterService,
+    'wg': WgDumpService
+}
+
+class MetricsStore:
+    """Per-peer metrics snapshot refreshed in the background on the scrape cadence
+
+    A collector thread fetches the whole fleet (counters, rates, handshake,
+    active flag) from the METRICS_SOURCE (Prometheus, the exporter itself
+    or `wg show dump`) every METRICS_POLL_INTERVAL seconds and swaps in a new
+    immutable snapshot, keyed by public key and joined to the peer names.
+    Read endpoints are served from the current snapshot without waiting on
+    Prometheus; when a collection fails the previous snapshot is kept and
+    its age grows.
+    """
+    _snapshot = None
+    _source = METRICS_SOURCES[METRICS_SOURCE]
+    _refresh_lock = threading.Lock()
+    _worker = None
+    _collections = 0
+    _failures = 0
+    _last_error = None
+    _last_duration = None
+
+    @staticmethod
+    def start():
+        """Start the collector thread"""
+        if MetricsStore._worker is None or not MetricsStore._worker.is_alive():
+            MetricsStore._worker = threading.Thread(target=MetricsStore._run, name='metrics-collector')
+            MetricsStore._worker.daemon = True
+            MetricsStore._worker.start()
+
+    @staticmethod
+    def refresh():
+        """Collect a new snapshot now, return True on success"""
+        with MetricsStore._refresh_lock:
+            started = time.monotonic()
+            try:
+                fleet = MetricsStore._source.get_fleet_metrics()
+                if fleet is None:
+                    raise RuntimeError("metrics source unavailable")
+            except Exception as e:
+                MetricsStore._failures += 1
+                MetricsStore._last_error = str(e)
+                return False
+            finally:
+                MetricsStore._collections += 1
+                MetricsStore._last_duration = round(time.monotonic() - started, 3)
+
+            MetricsStore._snapshot = MetricsStore._build_snapshot(fleet)
+            MetricsStore._last_error = None
+
+        ChangeLog.observe_metrics(
+            MetricsStore._snapshot['sort_keys'], PeerRegistry.find_by_public_key,
+            time.time() - ACTIVE_HANDSHAKE_SECONDS
+        )
+        return True
+
+    @staticmethod
+    def get():
+        """Current snapshot, or None if no collection succeeded yet
+
+        The very first call collects synchronously when the collector has
+        not run yet, so a request right after startup still gets metrics.
+        """
+        if MetricsStore._snapshot is None and MetricsStore._collections == 0:
+            MetricsStore.refresh()
+        return MetricsStore._snapshot
+
+    @staticmethod
+    def fleet():
+        """public_key -> {'name', 'stats', 'bandwidth'}, or None"""
+        snapshot = MetricsStore.get()
+        return snapshot['fleet'] if snapshot else None
+
+    @staticmethod
+    def handshakes():
+        """public_key -> latest handshake timestamp (0 if never), or None"""
+        snapshot = MetricsStore.get()
+        if snapshot is None:
+            return None
+        return {public_key: handshake for public_key, (_, handshake) in snapshot['sort_keys'].items()}
+
+    @staticmethod
+    def peer(public_key):
+        """Metrics of one peer ({'name', 'stats', 'bandwidth'}), or None without snapshot
+
+        A peer without any series yet gets zeroed counters.
+        """
+        snapshot = MetricsStore.get()
+        if snapshot is None:
+            return None
+        return snapshot['fleet'].get(public_key) or {
+            'name': PeerRegistry.find_by_public_key(public_key),
+            'stats': PrometheusService.build_peer_stats(public_key, 0, 0, 0, '', ''),
+            'bandwidth': None
+        }
+
+    @staticmethod
+    def summary():
+        snapshot = MetricsStore.get()
+        return snapshot['summary'] if snapshot else None
+
+    @staticmethod
+    def age():
+        """Seconds since the current snapshot was collected, or None"""
+        snapshot = MetricsStore._snapshot
+        return round(time.time() - snapshot['collected_at'], 1) if snapshot else None
+
+    @staticmethod
+    def is_stale():
+        """True when the snapshot comes from cached values or missed several collections"""
+        snapshot = MetricsStore._snapshot
+        if snapshot is None:
+            return True
+        return snapshot['stale'] or time.time() - snapshot['collected_at'] > 3 * METRICS_POLL_INTERVAL
+
+    @staticmethod
+    def validator():
+        """(tag, timestamp) of the current snapshot for HTTP validators, or None"""
+        snapshot = MetricsStore.get()
+        if snapshot is None:
+            return None
+        return f"{snapshot['collected_at']:.6f}-{int(MetricsStore.is_stale())}", snapshot['collected_at']
+
+    @staticmethod
+    def status():
+        return {
+            'source': METRICS_SOURCE,
+            'interval': METRICS_POLL_INTERVAL,
+            'running': MetricsStore._worker is not None and MetricsStore._worker.is_alive(),
+            'collections': MetricsStore._collections,
+            'failures': MetricsStore._failures,
+            'last_error': MetricsStore._last_error,
+            'last_duration_seconds': MetricsStore._last_duration,
+            'snapshot_age': MetricsStore.age(),
+            'peers': len(MetricsStore._snapshot['fleet']) if MetricsStore._snapshot else 0
+        }
+
+    # ===== HELPERS =====
+
+    @staticmethod
+    def _run():
+        while True:
+            started = time.monotonic()
+            try:
+                MetricsStore.refresh()
+            except Exception as e:
+                print(f"Warning: metrics collection failed: {e}")
+            # Caler la collecte suivante sur l'intervalle, durée de collecte comprise
+            time.sleep(max(0.0, METRICS_POLL_INTERVAL - (time.monotonic() - started)))
+
+    @staticmethod
+    def _build_snapshot(fleet):
+        peers = {}
+        sort_keys = {}
+        for public_key, metrics in fleet.items():
+            stats = metrics['stats']
+            peers[public_key] = dict(metrics, name=PeerRegistry.find_by_public_key(public_key))
+            sort_keys[public_key] = (stats['total_bytes'], stats['last_handshake_timestamp'])
+
+        return {
+            'fleet': peers,
+            'sort_keys': sort_keys,
+            'summary': PrometheusService.summarize_fleet(fleet),
+            'collected_at': time.time(),
+            'stale': MetricsStore._source.is_stale()
+        }
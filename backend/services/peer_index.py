@@ -0,0 +1,151 @@
+import base64
+import bisect
+import ipaddress
+import json
+import threading
+import time
+from services.metrics_store import MetricsStore, ACTIVE_HANDSHAKE_SECONDS
+from services.peer_registry import PeerRegistry
+
+SORT_FIELDS = ('name', 'traffic', 'handshake')
+STATUSES = ('active', 'inactive')
+
+class PeerIndex:
+    """Sorted views of the peers used to filter and paginate /peers
+
+    The order by name and by IP is rebuilt only when the registry changes,
+    the order by traffic and by last handshake only when a new metrics
+    snapshot is collected. A page is then cut from the sorted list with
+    bisect, starting after the cursor, so only the peers of the page are
+    enriched with their metrics.
+    """
+    _lock = threading.Lock()
+    _views = {}            # sort field -> (stamp, [(key, name)])
+    _ip_index = (None, [])  # (registry version, [(int ip, name)])
+
+    @staticmethod
+    def page(limit=None, cursor=None, sort='name', order='asc', prefix=None, status=None, ip_range=None):
+        """Return (names of the page, next cursor or None, total matching peers)
+
+        Raises ValueError on an invalid sort, status, IP range or cursor.
+        """
+        if sort not in SORT_FIELDS:
+            raise ValueError(f"sort must be one of {', '.join(SORT_FIELDS)}")
+        if order not in ('asc', 'desc'):
+            raise ValueError("order must be asc or desc")
+        if status is not None and status not in STATUSES:
+            raise ValueError(f"status must be one of {', '.join(STATUSES)}")
+
+        version, entries = PeerRegistry.snapshot()
+        by_name = {entry['name']: entry for entry in entries}
+        snapshot = MetricsStore.get() if sort != 'name' or status else None
+        sort_keys = snapshot['sort_keys'] if snapshot else {}
+        keys_stamp = snapshot['collected_at'] if snapshot else None
+
+        # Filtres : chacun donne un ensemble de noms tiré d'un index trié
+        allowed = None
+        if prefix:
+            names = PeerIndex._get_view('name', version, by_name, sort_keys, keys_stamp)
+            start = bisect.bisect_left(names, (prefix, ''))
+            end = bisect.bisect_left(names, (prefix + '\uffff', ''))
+            allowed = {name for _, name in names[start:end]}
+        if ip_range:
+            allowed = PeerIndex._intersect(allowed, PeerIndex._names_in_range(ip_range, version, entries))
+        if status:
+            cutoff = time.time() - ACTIVE_HANDSHAKE_SECONDS
+            active = {
+                entry['name'] for entry in entries
+                if sort_keys.get(entry['public_key'], (0, 0))[1] > cutoff
+            }
+            allowed = PeerIndex._intersect(
+                allowed, active if status == 'active' else set(by_name) - active
+            )
+
+        view = PeerIndex._get_view(sort, version, by_name, sort_keys, keys_stamp)
+        total = len(view) if allowed is None else len(allowed)
+
+        # Position de départ : juste après (ou avant, en ordre décroissant) le curseur
+        if cursor:
+            position = PeerIndex._decode_cursor(cursor, sort, order)
+            start = bisect.bisect_right(view, position) if order == 'asc' else bisect.bisect_left(view, position)
+        else:
+            start = 0 if order == 'asc' else len(view)
+
+        # Prendre un élément de plus que la page pour savoir s'il en reste
+        page = []
+        step = 1 if order == 'asc' else -1
+        index = start if order == 'asc' else start - 1
+        while 0 <= index < len(view) and (limit is None or len(page) <= limit):
+            if allowed is None or view[index][1] in allowed:
+                page.append(view[index])
+            index += step
+
+        next_cursor = None
+        if limit is not None and len(page) > limit:
+            page.pop()
+            next_cursor = PeerIndex._encode_cursor(page[-1], sort, order)
+        return [name for _, name in page], next_cursor, total
+
+    # ===== HELPERS =====
+
+    @staticmethod
+    def _get_view(sort, version, by_name, sort_keys, keys_stamp):
+        stamp = (version, keys_stamp if sort != 'name' else None)
+        with PeerIndex._lock:
+            cached = PeerIndex._views.get(sort)
+            if cached is not None and cached[0] == stamp:
+                return cached[1]
+
+        if sort == 'name':
+            view = [(name, name) for name in sorted(by_name)]
+        else:
+            field = 0 if sort == 'traffic' else 1
+            view = sorted(
+                (sort_keys.get(entry['public_key'], (0, 0))[field], name)
+                for name, entry in by_name.items()
+            )
+
+        with PeerIndex._lock:
+            PeerIndex._views[sort] = (stamp, view)
+        return view
+
+    @staticmethod
+    def _names_in_range(ip_range, version, entries):
+        network = ipaddress.ip_network(ip_range, strict=False)
+        if PeerIndex._ip_index[0] != version:
+            index = []
+            for entry in entries:
+                try:
+                    index.append((int(ipaddress.ip_address(entry['allowed_ip'])), entry['name']))
+                except (TypeError, ValueError):
+                    continue
+            PeerIndex._ip_index = (version, sorted(index))
+
+        ips = PeerIndex._ip_index[1]
+        start = bisect.bisect_left(ips, (int(network.network_address), ''))
+        end = bisect.bisect_right(ips, (int(network.broadcast_address), '\uffff'))
+        return {name for _, name in ips[start:end]}
+
+    @staticmethod
+    def _intersect(allowed, names):
+        return names if allowed is None else allowed & names
+
+    @staticmethod
+    def _encode_cursor(item, sort, order):
+        payload = json.dumps({'s': sort, 'o': order, 'k': item[0], 'n': item[1]})
+        return base64.urlsafe_b64encode(payload.encode('utf-8')).decode('ascii')
+
+    @staticmethod
+    def _decode_cursor(cursor, sort, order):
+        try:
+            payload = json.loads(base64.urlsafe_b64decode(cursor.encode('ascii')))
+            if payload['s'] != sort or payload['o'] != order:
+                raise ValueError
+            key, name = payload['k'], payload['n']
+            # La clé est comparée à celles de la vue : elle doit être du même type
+            key_types = (str,) if sort == 'name' else (int, float)
+            if not isinstance(key, key_types) or isinstance(key, bool) or not isinstance(name, str):
+                raise ValueError
+            return (key, name)
+        except (ValueError, KeyError, TypeError):
+            raise ValueError("Invalid cursor for this sort order")
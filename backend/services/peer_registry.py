@@ -0,0 +1,212 @@
+import hashlib
+import os
+import threading
+import time
+from config.settings import WIREGUARD_PATH, SERVER_CONFIG_PATH, PEER_REGISTRY_CHECK_INTERVAL
+from services.change_log import ChangeLog
+from services.config_service import ConfigService
+from services.config_store import ConfigStore
+from services.wireguard_service import WireGuardService
+
+class PeerRegistry:
+    """In-memory index of the peers, shared by every request of the process
+
+    Built once from the peer store, kept up to date by the API on add/delete,
+    and rebuilt when the WireGuard directory, wg0.conf, the store or the peer
+    template is modified from outside (detected through their mtime).
+    """
+    _peers = {}            # name -> peer entry
+    _by_public_key = {}    # public key -> name
+    _by_ip = {}            # allowed IP -> name
+    _signature = None
+    _last_check = 0
+    _version = 0           # incremented on every change of the index
+    _state = None          # (tag, last modified) of the configuration, for HTTP validators
+    _lock = threading.RLock()
+
+    @staticmethod
+    def load():
+        """(Re)build the whole index from the peer store"""
+        with PeerRegistry._lock:
+            signature = PeerRegistry._current_signature()
+            server_peers = PeerRegistry._read_server_peers()
+
+            peers = {}
+            for stored in ConfigService.get_peer_store().list_peers():
+                name = stored['name']
+                public_key, allowed_ip = server_peers.get(name, (None, None))
+                peers[name] = PeerRegistry._build_entry(
+                    name, stored['public_key'] or public_key, stored['allowed_ip'] or allowed_ip,
+                    stored['created_at']
+                )
+
+            if PeerRegistry._signature is not None:
+                # Rechargement après une modification externe : journaliser les différences
+                ChangeLog.record_peers_diff(PeerRegistry._peers, peers)
+            PeerRegistry._peers = peers
+            PeerRegistry._by_public_key = {p['public_key']: n for n, p in peers.items() if p['public_key']}
+            PeerRegistry._by_ip = {p['allowed_ip']: n for n, p in peers.items() if p['allowed_ip']}
+            PeerRegistry._signature = signature
+            PeerRegistry._last_check = time.monotonic()
+            PeerRegistry._version += 1
+            PeerRegistry._state = PeerRegistry._build_state(signature)
+
+    @staticmethod
+    def refresh_if_changed():
+        """Rebuild the index if the files were changed outside of the API"""
+        now = time.monotonic()
+        if PeerRegistry._signature is not None and now - PeerRegistry._last_check < PEER_REGISTRY_CHECK_INTERVAL:
+            return
+
+        with PeerRegistry._lock:
+            PeerRegistry._last_check = now
+            if PeerRegistry._signature != PeerRegistry._current_signature():
+                PeerRegistry.load()
+
+    @staticmethod
+    def register(name, public_key, allowed_ip):
+        """Add or update a peer after it has been written to disk"""
+        with PeerRegistry._lock:
+            PeerRegistry._remove_indexes(name)
+            entry = PeerRegistry._build_entry(name, public_key, allowed_ip, time.time())
+            previous = PeerRegistry._peers.get(name)
+            PeerRegistry._peers[name] = entry
+            ChangeLog.record_peers_diff({name: previous} if previous else {}, {name: entry})
+            if entry['public_key']:
+                PeerRegistry._by_public_key[entry['public_key']] = name
+            if entry['allowed_ip']:
+                PeerRegistry._by_ip[entry['allowed_ip']] = name
+            PeerRegistry._signature = PeerRegistry._current_signature()
+            PeerRegistry._version += 1
+            PeerRegistry._state = PeerRegistry._build_state(PeerRegistry._signature)
+            return entry
+
+    @staticmethod
+    def unregister(name):
+        """Remove a peer after it has been deleted from disk"""
+        with PeerRegistry._lock:
+            PeerRegistry._remove_indexes(name)
+            entry = PeerRegistry._peers.pop(name, None)
+            if entry is not None:
+                ChangeLog.record('deleted', name)
+            PeerRegistry._signature = PeerRegistry._current_signature()
+            PeerRegistry._version += 1
+            PeerRegistry._state = PeerRegistry._build_state(PeerRegistry._signature)
+            return entry
+
+    @staticmethod
+    def list_peers():
+        """List all peers as objects with a `name` key"""
+        PeerRegistry.refresh_if_changed()
+        return [{"name": name} for name in sorted(PeerRegistry._peers)]
+
+    @staticmethod
+    def version():
+        """Counter that changes whenever a peer is added, removed or reloaded"""
+        PeerRegistry.refresh_if_changed()
+        return PeerRegistry._version
+
+    @staticmethod
+    def snapshot():
+        """Return (version, list of peer entries) taken atomically"""
+        PeerRegistry.refresh_if_changed()
+        with PeerRegistry._lock:
+            return PeerRegistry._version, list(PeerRegistry._peers.values())
+
+    @staticmethod
+    def state():
+        """Return (tag, last modified timestamp) of the configuration
+
+        The tag combines the ConfigStore generation with the mtimes of the
+        WireGuard directory, wg0.conf, the peer store, the peer template and
+        the server key, so it is the same in every worker for the same files.
+        It is only recomputed when the index changes: answering a conditional
+        request costs no file access between two registry checks.
+        """
+        PeerRegistry.refresh_if_changed()
+        return PeerRegistry._state
+
+    @staticmethod
+    def count():
+        PeerRegistry.refresh_if_changed()
+        return len(PeerRegistry._peers)
+
+    @staticmethod
+    def exists(name):
+        PeerRegistry.refresh_if_changed()
+        return name in PeerRegistry._peers
+
+    @staticmethod
+    def get(name):
+        PeerRegistry.refresh_if_changed()
+        return PeerRegistry._peers.get(name)
+
+    @staticmethod
+    def get_public_key(name):
+        entry = PeerRegistry.get(name)
+        return entry['public_key'] if entry else None
+
+    @staticmethod
+    def find_by_public_key(public_key):
+        """Return the name of the peer owning `public_key`, or None"""
+        PeerRegistry.refresh_if_changed()
+        return PeerRegistry._by_public_key.get(public_key)
+
+    @staticmethod
+    def find_by_ip(allowed_ip):
+        """Return the name of the peer using `allowed_ip`, or None"""
+        PeerRegistry.refresh_if_changed()
+        return PeerRegistry._by_ip.get(allowed_ip.split('/')[0])
+
+    # ===== HELPERS =====
+
+    @staticmethod
+    def _build_entry(name, public_key, allowed_ip, created_at):
+        return {
+            'name': name,
+            'public_key': public_key,
+            'allowed_ip': allowed_ip.split('/')[0] if allowed_ip else None,
+            'directory': os.path.join(WIREGUARD_PATH, name),
+            'peer_conf': os.path.join(WIREGUARD_PATH, name, "peer.conf"),
+            'config_file': os.path.join(WIREGUARD_PATH, f"{name}.conf"),
+            'created_at': created_at
+        }
+
+    @staticmethod
+    def _remove_indexes(name):
+        entry = PeerRegistry._peers.get(name)
+        if entry is None:
+            return
+        if PeerRegistry._by_public_key.get(entry['public_key']) == name:
+            del PeerRegistry._by_public_key[entry['public_key']]
+        if PeerRegistry._by_ip.get(entry['allowed_ip']) == name:
+            del PeerRegistry._by_ip[entry['allowed_ip']]
+
+    @staticmethod
+    def _current_signature():
+        """mtimes of the WireGuard directory, wg0.conf, the peer store and the peer template"""
+        signature = []
+        for path in (WIREGUARD_PATH, os.path.join(WIREGUARD_PATH, SERVER_CONFIG_PATH)):
+            try:
+                signature.append(os.stat(path).st_mtime_ns)
+            except FileNotFoundError:
+                signature.append(None)
+        signature.append(ConfigService.get_peer_store().signature())
+        signature.extend(ConfigService.get_template_signature())
+        return tuple(signature)
+
+    @staticmethod
+    def _build_state(signature):
+        generation = ConfigStore.generation()
+        tag = hashlib.sha1(repr((generation, signature)).encode('utf-8')).hexdigest()[:16]
+        mtimes = [mtime for mtime in signature if mtime is not None]
+        return f"{generation}-{tag}", max(mtimes) / 1e9 if mtimes else 0
+
+    @staticmethod
+    def _read_server_peers():
+        """Read name -> (public key, allowed IP) from the wg0.conf model"""
+        try:
+            server_peers = WireGuardService.get_server_peers()
+        except FileNotFoundError:
+            return {}
+        return {peer['name']: (peer['public_key'], peer['allowed_ips']) for peer in server_peers}
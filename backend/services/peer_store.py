@@ -0,0 +1,243 @@
+import os
+import sqlite3
+import threading
+import time
+from contextlib import closing, contextmanager
+from config.settings import WIREGUARD_PATH
+from services.config_store import ConfigStore
+from utils.helpers import RESERVED_DIRECTORIES
+
+def _layout_paths(name):
+    """Directory and `<name>.conf` of a peer, never WIREGUARD_PATH itself or a reserved directory"""
+    if not name or name in ('.', '..') or name in RESERVED_DIRECTORIES or os.sep in name:
+        raise ValueError(f"Invalid peer name: {name!r}")
+    return [os.path.join(WIREGUARD_PATH, name), os.path.join(WIREGUARD_PATH, f"{name}.conf")]
+
+
+class FilePeerStore:
+    """Peers stored as the linuxserver/wireguard layout
+
+    One directory per peer with its three key files and `peer.conf`, plus a
+    top-level `<name>.conf`. `render(name, private_key, public_key,
+    preshared_key, ip)` returns the {path: content} of those files.
+    """
+    backend = 'files'
+
+    def __init__(self, render):
+        self.render = render
+
+    @contextmanager
+    def batch(self):
+        """Group peer changes with the wg0.conf update they belong to"""
+        with ConfigStore.transaction():
+            yield
+
+    def peer_files(self, name, private_key, public_key, preshared_key, peer_ip):
+        """Files to commit with wg0.conf when the peer is added"""
+        return self.render(name, private_key, public_key, preshared_key, peer_ip)
+
+    def peer_paths(self, name):
+        """Paths to delete with wg0.conf when the peer is removed"""
+        return _layout_paths(name)
+
+    def list_peers(self):
+        """List the stored peers as dicts (name, public_key, allowed_ip, created_at)"""
+        peers = []
+        try:
+            entries = os.listdir(WIREGUARD_PATH)
+        except FileNotFoundError:
+            return peers
+
+        for name in entries:
+            peer_dir = os.path.join(WIREGUARD_PATH, name)
+            if name in RESERVED_DIRECTORIES or name.startswith('.') or not os.path.isdir(peer_dir):
+                continue
+            peers.append({
+                'name': name,
+                'public_key': self._read_key(peer_dir, f"publickey-{name}"),
+                'allowed_ip': None,
+                'created_at': os.stat(peer_dir).st_mtime
+            })
+        return peers
+
+    def read_keys(self, name):
+        """Return (private_key, public_key, preshared_key) read from the peer directory"""
+        peer_dir = os.path.join(WIREGUARD_PATH, name)
+        return tuple(
+            self._read_key(peer_dir, f"{kind}-{name}") for kind in ('privatekey', 'publickey', 'presharedkey')
+        )
+
+    def get_config(self, name):
+        """Content of the downloadable `<name>.conf`, or None"""
+        try:
+            with open(os.path.join(WIREGUARD_PATH, f"{name}.conf"), 'r') as f:
+                return f.read()
+        except FileNotFoundError:
+            return None
+
+    def signature(self):
+        # Les répertoires des peers sont déjà couverts par le mtime de WIREGUARD_PATH
+        return None
+
+    @staticmethod
+    def _read_key(peer_dir, filename):
+        try:
+            with open(os.path.join(peer_dir, filename), 'r') as f:
+                return f.read().strip() or None
+        except FileNotFoundError:
+            return None
+
+
+class SQLitePeerStore:
+    """Peers, keys, IPs and metadata stored in a single indexed SQLite file
+
+    Nothing is written per peer under WIREGUARD_PATH: the downloadable
+    configuration is rendered on demand. Changes are made inside batch(),
+    which holds the ConfigStore lock and one SQLite transaction committed
+    only once wg0.conf has been written.
+    """
+    backend = 'sqlite'
+
+    SCHEMA = """
+        CREATE TABLE IF NOT EXISTS peers (
+            name TEXT PRIMARY KEY,
+            public_key TEXT UNIQUE,
+            private_key TEXT,
+            preshared_key TEXT,
+            allowed_ip TEXT UNIQUE,
+            created_at REAL NOT NULL,
+            metadata TEXT NOT NULL DEFAULT '{}'
+        );
+        CREATE TABLE IF NOT EXISTS meta (
+            key TEXT PRIMARY KEY,
+            value TEXT
+        );
+    """
+
+    def __init__(self, path, render):
+        self.path = path
+        self.render = render
+        created = not os.path.exists(path)
+        self._local = threading.local()
+        with closing(self._connect()) as conn:
+            conn.executescript(self.SCHEMA)
+        if created:
+            # La base contient les clés privées
+            os.chmod(path, 0o600)
+
+    @contextmanager
+    def batch(self):
+        """Group peer changes with the wg0.conf update they belong to"""
+        with ConfigStore.transaction():
+            if getattr(self._local, 'conn', None) is not None:
+                yield
+                return
+
+            conn = self._connect()
+            self._local.conn = conn
+            try:
+                conn.execute("BEGIN IMMEDIATE")
+                yield
+                conn.execute("COMMIT")
+            except Exception:
+                conn.execute("ROLLBACK")
+                raise
+            finally:
+                self._local.conn = None
+                conn.close()
+
+    def peer_files(self, name, private_key, public_key, preshared_key, peer_ip):
+        """Insert the peer in the current batch, no file has to be written"""
+        self._batch_conn().execute(
+            "INSERT INTO peers (name, public_key, private_key, preshared_key, allowed_ip, created_at) "
+            "VALUES (?, ?, ?, ?, ?, ?)",
+            (name, public_key, private_key, preshared_key, str(peer_ip).split('/')[0], time.time())
+        )
+        return {}
+
+    def peer_paths(self, name):
+        """Delete the peer in the current batch, plus any file left from the directory layout"""
+        paths = _layout_paths(name)
+        self._batch_conn().execute("DELETE FROM peers WHERE name = ?", (name,))
+        return paths
+
+    def list_peers(self):
+        """List the stored peers as dicts (name, public_key, allowed_ip, created_at)"""
+        with closing(self._connect()) as conn:
+            rows = conn.execute(
+                "SELECT name, public_key, allowed_ip, created_at FROM peers ORDER BY name"
+            ).fetchall()
+        return [dict(row) for row in rows]
+
+    def read_keys(self, name):
+        """Return (private_key, public_key, preshared_key) of a peer"""
+        row = self._get(name)
+        if row is None:
+            return (None, None, None)
+        return row['private_key'], row['public_key'], row['preshared_key']
+
+    def get_config(self, name):
+        """Render the downloadable `<name>.conf`, or None"""
+        row = self._get(name)
+        if row is None:
+            return None
+        if not row['private_key']:
+            # Peer migré sans clé privée : servir l'ancien fichier s'il existe encore
+            return FilePeerStore(self.render).get_config(name)
+
+        files = self.render(name, row['private_key'], row['public_key'], row['preshared_key'], row['allowed_ip'])
+        return files[os.path.join(WIREGUARD_PATH, f"{name}.conf")]
+
+    def is_migrated(self):
+        """True once migrate_from() has committed"""
+        with closing(self._connect()) as conn:
+            return conn.execute("SELECT 1 FROM meta WHERE key = 'migrated'").fetchone() is not None
+
+    def migrate_from(self, file_store, server_peers):
+        """One-shot import of the directory layout
+
+        `server_peers` maps a peer name to its (public key, allowed IPs) in
+        wg0.conf. Existing rows are kept; the files are left in place. The
+        'migrated' marker is written in the same transaction, so an import
+        that fails is run again on the next start.
+        Returns the number of imported peers.
+        """
+        imported = 0
+        with self.batch():
+            conn = self._batch_conn()
+            conn.execute("INSERT OR REPLACE INTO meta (key, value) VALUES ('migrated', ?)", (str(time.time()),))
+            for peer in file_store.list_peers():
+                name = peer['name']
+                private_key, public_key, preshared_key = file_store.read_keys(name)
+                server_public_key, allowed_ips = server_peers.get(name, (None, None))
+                allowed_ip = allowed_ips.split(',')[0].split('/')[0].strip() if allowed_ips else None
+                cursor = conn.execute(
+                    "INSERT OR IGNORE INTO peers "
+                    "(name, public_key, private_key, preshared_key, allowed_ip, created_at) "
+                    "VALUES (?, ?, ?, ?, ?, ?)",
+                    (name, public_key or server_public_key, private_key, preshared_key,
+                     allowed_ip, peer['created_at'])
+                )
+                imported += cursor.rowcount
+        return imported
+
+    def signature(self):
+        try:
+            return os.stat(self.path).st_mtime_ns
+        except FileNotFoundError:
+            return None
+
+    def _connect(self):
+        conn = sqlite3.connect(self.path, timeout=30, isolation_level=None, check_same_thread=False)
+        conn.row_factory = sqlite3.Row
+        return conn
+
+    def _batch_conn(self):
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            raise RuntimeError("Peer changes must be made inside batch()")
+        return conn
+
+    def _get(self, name):
+        with closing(self._connect()) as conn:
+            return conn.execute("SELECT * FROM peers WHERE name = ?", (name,)).fetchone()
@@ -0,0 +1,160 @@
+import os
+import re
+import threading
+from config.settings import (
+    WIREGUARD_PATH, SERVER_PUBLIC_KEY_PLACEHOLDER, PEER_TEMPLATE_PATH, PEER_ENDPOINT_HOST,
+    PEER_ENDPOINT_PORT, PEER_ALLOWED_IPS
+)
+
+# Modèle utilisé quand templates/peer.conf est absent (identique à celui du conteneur)
+DEFAULT_TEMPLATE = """[Interface]
+Address = ${CLIENT_IP}
+PrivateKey = $(cat /config/${PEER_ID}/privatekey-${PEER_ID})
+ListenPort = 51820
+DNS = ${PEERDNS}
+
+[Peer]
+PublicKey = $(cat /config/server/publickey-server)
+PresharedKey = $(cat /config/${PEER_ID}/presharedkey-${PEER_ID})
+Endpoint = ${SERVERURL}:${SERVERPORT}
+AllowedIPs = ${ALLOWEDIPS}
+"""
+
+# ${VAR}, $(cat /config/${PEER_ID}/<kind>-${PEER_ID}) et $(cat /config/server/publickey-server)
+PLACEHOLDER = re.compile(
+    r"\$\(cat /config/\$\{PEER_ID\}/(?P<key>privatekey|publickey|presharedkey)-\$\{PEER_ID\}\)"
+    r"|(?P<server_key>\$\(cat /config/server/publickey-server\))"
+    r"|\$\{(?P<var>\w+)\}"
+)
+
+# Valeurs propres à chaque peer, remplies au rendu
+PEER_SLOTS = {
+    'CLIENT_IP': 'peer_ip',
+    'PEER_ID': 'name',
+    'privatekey': 'private_key',
+    'publickey': 'public_key',
+    'presharedkey': 'preshared_key'
+}
+
+class PeerConfigTemplate:
+    """templates/peer.conf of the container, compiled once
+
+    Server-wide placeholders (server public key, endpoint, DNS, AllowedIPs)
+    are substituted at compile time, leaving a list of (literal, slot)
+    segments where only the per-peer values remain. Lines whose server-wide
+    value is empty (e.g. no DNS) are dropped. The compiled forms are rebuilt
+    when the template or the server public key changes on disk.
+    """
+
+    def __init__(self, path=None, server_public_key_path=None):
+        self.path = path or os.path.join(WIREGUARD_PATH, PEER_TEMPLATE_PATH)
+        self.server_public_key_path = server_public_key_path or os.path.join(
+            WIREGUARD_PATH, "server", "publickey-server"
+        )
+        self.version = 0
+        self._signature = None
+        self._compiled = {}  # dns -> segments
+        self._lock = threading.Lock()
+
+    def render(self, name, peer_ip, private_key, public_key, preshared_key, dns=None):
+        """Render the configuration of a peer"""
+        values = {
+            'name': name,
+            'peer_ip': peer_ip,
+            'private_key': private_key,
+            'public_key': public_key,
+            'preshared_key': preshared_key
+        }
+        return ''.join(
+            literal if slot is None else (values[slot] or '')
+            for literal, slot in self._get_compiled(dns or '')
+        )
+
+    def check(self):
+        """Drop the compiled forms if the template or the server key changed, return the version"""
+        signature = self.signature()
+        with self._lock:
+            if signature != self._signature:
+                self._signature = signature
+                self._compiled = {}
+                self.version += 1
+            return self.version
+
+    def _get_compiled(self, dns):
+        self.check()
+        with self._lock:
+            segments = self._compiled.get(dns)
+            if segments is None:
+                segments = self._compile(dns)
+                self._compiled[dns] = segments
+            return segments
+
+    def _compile(self, dns):
+        try:
+            with open(self.path, 'r') as f:
+                text = f.read()
+        except FileNotFoundError:
+            text = DEFAULT_TEMPLATE
+
+        server_values = {
+            'server_key': self._read_server_public_key(),
+            'SERVERURL': PEER_ENDPOINT_HOST,
+            'SERVERPORT': str(PEER_ENDPOINT_PORT),
+            'PEERDNS': dns,
+            'ALLOWEDIPS': PEER_ALLOWED_IPS
+        }
+
+        segments = []
+        literal = []
+        for line in text.splitlines(keepends=True):
+            line_segments = []
+            position = 0
+            empty_value = False
+            for match in PLACEHOLDER.finditer(line):
+                line_segments.append((line[position:match.start()], None))
+                slot_name = match.group('key') or match.group('var')
+                if match.group('server_key'):
+                    value = server_values['server_key']
+                elif slot_name in PEER_SLOTS:
+                    line_segments.append(('', PEER_SLOTS[slot_name]))
+                    position = match.end()
+                    continue
+                else:
+                    # Variable inconnue : conservée telle quelle
+                    value = server_values.get(slot_name, match.group(0))
+                empty_value = empty_value or value == ''
+                line_segments.append((value, None))
+                position = match.end()
+            line_segments.append((line[position:], None))
+
+            if empty_value:
+                continue
+            for text_part, slot in line_segments:
+                if slot is None:
+                    literal.append(text_part)
+                else:
+                    segments.append((''.join(literal), None))
+                    segments.append(('', slot))
+                    literal = []
+        segments.append((''.join(literal), None))
+        return [segment for segment in segments if segment[1] is not None or segment[0]]
+
+    def _read_server_public_key(self):
+        try:
+            with open(self.server_public_key_path, 'r') as f:
+                return f.read().strip()
+        except FileNotFoundError:
+            return SERVER_PUBLIC_KEY_PLACEHOLDER
+        except Exception as e:
+            print(f"Error reading publickey-server: {e}")
+            return SERVER_PUBLIC_KEY_PLACEHOLDER
+
+    def signature(self):
+        """mtimes of the template and of the server public key"""
+        signature = []
+        for path in (self.path, self.server_public_key_path):
+            try:
+                signature.append(os.stat(path).st_mtime_ns)
+            except FileNotFoundError:
+                signature.append(None)
+        return tuple(signature)
@@ -1,30 +1,154 @@
+import math
+import time
 import requests
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
-from config.settings import PROMETHEUS_URL
+from requests.adapters import HTTPAdapter
+from config.settings import (
+    PROMETHEUS_URL, PROMETHEUS_POOL_SIZE, PROMETHEUS_QUERY_TIMEOUT,
+    PROMETHEUS_CACHE_TTL, PROMETHEUS_CACHE_SIZE, PROMETHEUS_BREAKER_WINDOW,
+    PROMETHEUS_BREAKER_MIN_CALLS, PROMETHEUS_BREAKER_ERROR_RATE,
+    PROMETHEUS_BREAKER_BACKOFF_MIN, PROMETHEUS_BREAKER_BACKOFF_MAX, PROMETHEUS_SCRAPE_INTERVAL,
+    HISTORY_DEFAULT_POINTS, HISTORY_OVERSAMPLING
+)
+from utils.cache import TTLCache
+from utils.circuit_breaker import CircuitBreaker
+from utils.downsample import lttb_indices, minmax_indices
+from utils.helpers import parse_duration
+
+# Pas « ronds » de l'historique (secondes), pour partager le cache entre les appels
+HISTORY_STEPS = (5, 10, 15, 30, 60, 120, 300, 600, 900, 1800, 3600, 7200, 10800, 21600, 43200, 86400)
+# Nombre maximal de points par série accepté par Prometheus
+PROMETHEUS_MAX_POINTS = 11000
+# Pas de l'historique au format points quand aucun budget n'est demandé
+HISTORY_LEGACY_STEP = 60
+# Au-delà de cette durée, ce pas est remplacé par un budget de points
+HISTORY_LEGACY_MAX_HOURS = 24
+# Budget appliqué alors : autant de points que sur HISTORY_LEGACY_MAX_HOURS au pas d'une minute
+HISTORY_LEGACY_MAX_POINTS = HISTORY_LEGACY_MAX_HOURS * 3600 // HISTORY_LEGACY_STEP
+
+def _create_session():
+    """Crée une session HTTP avec un pool de connexions keep-alive"""
+    session = requests.Session()
+    adapter = HTTPAdapter(pool_connections=1, pool_maxsize=PROMETHEUS_POOL_SIZE)
+    session.mount('http://', adapter)
+    session.mount('https://', adapter)
+    return session
+
+def _probe_prometheus():
+    """Sonde le endpoint de santé de Prometheus"""
+    try:
+        response = PrometheusService._session.get(f"{PROMETHEUS_URL}/-/healthy", timeout=5)
+        return response.status_code == 200
+    except requests.exceptions.RequestException:
+        return False
 
 class PrometheusService:
     """Service pour interagir avec Prometheus"""
     
+    # Session partagée et pool de threads pour les requêtes parallèles
+    _session = _create_session()
+    _executor = ThreadPoolExecutor(max_workers=PROMETHEUS_POOL_SIZE, thread_name_prefix='prometheus')
+    
+    # Cache des résultats, aligné sur l'intervalle de scrape
+    _cache = TTLCache(PROMETHEUS_CACHE_TTL, PROMETHEUS_CACHE_SIZE)
+    
+    # Disjoncteur : échec immédiat quand Prometheus est indisponible
+    _breaker = CircuitBreaker(
+        _probe_prometheus,
+        window_size=PROMETHEUS_BREAKER_WINDOW,
+        min_calls=PROMETHEUS_BREAKER_MIN_CALLS,
+        error_rate=PROMETHEUS_BREAKER_ERROR_RATE,
+        backoff_min=PROMETHEUS_BREAKER_BACKOFF_MIN,
+        backoff_max=PROMETHEUS_BREAKER_BACKOFF_MAX,
+        name='prometheus'
+    )
+    
     @staticmethod
     def query(query):
-        """Exécute une requête PromQL instantanée"""
+        """Exécute une requête PromQL instantanée (résultat mis en cache)"""
+        return PrometheusService._cached(
+            ('query', query),
+            lambda: PrometheusService._fetch_query(query)
+        )
+    
+    @staticmethod
+    def query_range(query, start, end, step='15s'):
+        """Exécute une requête PromQL sur une plage de temps (résultat mis en cache)"""
+        # Aligner la plage sur le pas pour que les appels proches partagent la même clé
+        step_seconds = parse_duration(step)
+        start = int(start - start % step_seconds)
+        end = int(end - end % step_seconds)
+        
+        return PrometheusService._cached(
+            ('query_range', query, start, end, step_seconds),
+            lambda: PrometheusService._fetch_query_range(query, start, end, step)
+        )
+    
+    @staticmethod
+    def cache_stats():
+        """Retourne les compteurs du cache de requêtes"""
+        return PrometheusService._cache.stats()
+    
+    @staticmethod
+    def is_stale():
+        """Indique si les métriques servies sont les dernières connues (circuit ouvert)"""
+        return PrometheusService._breaker.is_open()
+    
+    @staticmethod
+    def breaker_status():
+        """Retourne l'état du disjoncteur Prometheus"""
+        return PrometheusService._breaker.status()
+    
+    @staticmethod
+    def _cached(key, fetch):
+        """Sert une requête depuis le cache, ou la dernière valeur connue si Prometheus est indisponible"""
+        if PrometheusService._breaker.allow_request():
+            result = PrometheusService._cache.get_or_load(
+                key,
+                fetch,
+                cacheable=lambda result: 'error' not in result and not result.get('stale')
+            )
+            if 'error' not in result:
+                return result
+        else:
+            result = {"error": "Prometheus unavailable (circuit open)"}
+        
+        # Repli sur la dernière valeur connue, marquée comme périmée
+        last_known = PrometheusService._cache.peek(key)
+        if last_known is not None:
+            return dict(last_known, stale=True)
+        return result
+    
+    @staticmethod
+    def _record_failure(e):
+        """Comptabilise une erreur pour le disjoncteur (pannes et erreurs serveur uniquement)"""
+        response = getattr(e, 'response', None)
+        if response is None or response.status_code >= 500:
+            PrometheusService._breaker.record_failure()
+    
+    @staticmethod
+    def _fetch_query(query):
+        """Envoie une requête PromQL instantanée à Prometheus"""
         try:
-            response = requests.get(
+            response = PrometheusService._session.get(
                 f"{PROMETHEUS_URL}/api/v1/query",
                 params={'query': query},
-                timeout=10
+                timeout=PROMETHEUS_QUERY_TIMEOUT
             )
             response.raise_for_status()
+            PrometheusService._breaker.record_success()
             return response.json()
         except requests.exceptions.RequestException as e:
             print(f"Error querying Prometheus: {e}")
+            PrometheusService._record_failure(e)
             return {"error": str(e)}
     
     @staticmethod
-    def query_range(query, start, end, step='15s'):
-        """Exécute une requête PromQL sur une plage de temps"""
+    def _fetch_query_range(query, start, end, step):
+        """Envoie une requête PromQL sur une plage de temps à Prometheus"""
         try:
-            response = requests.get(
+            response = PrometheusService._session.get(
                 f"{PROMETHEUS_URL}/api/v1/query_range",
                 params={
                     'query': query,
@@ -32,73 +156,261 @@ class PrometheusService:
                     'end': end,
                     'step': step
                 },
-                timeout=10
+                timeout=PROMETHEUS_QUERY_TIMEOUT
             )
             response.raise_for_status()
+            PrometheusService._breaker.record_success()
             return response.json()
         except requests.exceptions.RequestException as e:
             print(f"Error querying Prometheus range: {e}")
+            PrometheusService._record_failure(e)
             return {"error": str(e)}
     
     @staticmethod
-    def get_all_peers_metrics():
-        """Récupère toutes les métriques pour tous les peers"""
-        query = 'wireguard_sent_bytes_total'
-        result = PrometheusService.query(query)
-        
-        if 'error' in result or result.get('status') != 'success':
-            return []
-        
-        peers = []
-        for metric in result['data']['result']:
-            peer = {
-                'public_key': metric['metric'].get('public_key', ''),
-                'interface': metric['metric'].get('interface', ''),
-                'allowed_ips': metric['metric'].get('allowed_ips', ''),
-                'sent_bytes': int(metric['value'][1])
-            }
-            peers.append(peer)
-        
-        return peers
+    def query_many(queries):
+        """Exécute plusieurs requêtes PromQL instantanées en parallèle
+
+        Les résultats sont retournés dans le même ordre que les requêtes.
+        """
+        return list(PrometheusService._executor.map(PrometheusService.query, queries))
     
     @staticmethod
-    def get_peer_stats(public_key):
-        """Récupère les statistiques complètes d'un peer"""
-        # Données envoyées
-        sent_query = f'wireguard_sent_bytes_total{{public_key="{public_key}"}}'
-        sent_result = PrometheusService.query(sent_query)
-        
-        # Données reçues
-        recv_query = f'wireguard_received_bytes_total{{public_key="{public_key}"}}'
-        recv_result = PrometheusService.query(recv_query)
-        
-        # Dernier handshake
-        handshake_query = f'wireguard_latest_handshake_seconds{{public_key="{public_key}"}}'
-        handshake_result = PrometheusService.query(handshake_query)
-        
-        # Vérifier les erreurs
-        if ('error' in sent_result or 'error' in recv_result or 
-            sent_result.get('status') != 'success'):
+    def query_range_many(queries, start, end, step='15s'):
+        """Exécute plusieurs requêtes PromQL sur une plage de temps en parallèle"""
+        return list(PrometheusService._executor.map(
+            lambda query: PrometheusService.query_range(query, start, end, step),
+            queries
+        ))
+    
+    @staticmethod
+    def get_fleet_metrics():
+        """Récupère les métriques de tous les peers en un nombre fixe de requêtes
+
+        Requêtes du collecteur de MetricsStore. Retourne un dict
+        public_key -> {'stats': ..., 'bandwidth': ...}, ou None si Prometheus
+        n'a pas pu répondre.
+        """
+        (sent_result, recv_result, handshake_result,
+         sent_rate_result, recv_rate_result) = PrometheusService.query_many([
+            'wireguard_sent_bytes_total',
+            'wireguard_received_bytes_total',
+            'wireguard_latest_handshake_seconds',
+            'rate(wireguard_sent_bytes_total[5m])',
+            'rate(wireguard_received_bytes_total[5m])'
+        ])
+
+        if 'error' in sent_result or sent_result.get('status') != 'success':
+            return None
+
+        # Indexer chaque vecteur par public_key pour une jointure en mémoire
+        sent = PrometheusService._index_by_public_key(sent_result)
+        recv = PrometheusService._index_by_public_key(recv_result)
+        handshakes = PrometheusService._index_by_public_key(handshake_result)
+        sent_rates = PrometheusService._index_by_public_key(sent_rate_result)
+        recv_rates = PrometheusService._index_by_public_key(recv_rate_result)
+
+        fleet = {}
+        for public_key, (labels, sent_value) in sent.items():
+            recv_value = recv.get(public_key, (None, 0))[1]
+            handshake_value = handshakes.get(public_key, (None, 0))[1]
+
+            fleet[public_key] = {
+                'stats': PrometheusService.build_peer_stats(
+                    public_key,
+                    int(sent_value),
+                    int(recv_value),
+                    int(handshake_value),
+                    labels.get('interface', ''),
+                    labels.get('allowed_ips', '')
+                ),
+                'bandwidth': (
+                    PrometheusService.build_bandwidth(
+                        public_key, sent_rates[public_key][1], recv_rates.get(public_key, (None, 0))[1]
+                    )
+                    if public_key in sent_rates else None
+                )
+            }
+
+        return fleet
+
+    @staticmethod
+    def summarize_fleet(fleet):
+        """Calcule le résumé global à partir des métriques déjà récupérées"""
+        total_peers = len(fleet)
+        active_peers = 0
+        total_sent_bytes = 0
+        total_recv_bytes = 0
+        bandwidth_sent = 0
+        bandwidth_recv = 0
+
+        for peer in fleet.values():
+            stats = peer['stats']
+            if stats['is_active']:
+                active_peers += 1
+            total_sent_bytes += stats['sent_bytes']
+            total_recv_bytes += stats['received_bytes']
+
+            if peer['bandwidth']:
+                bandwidth_sent += peer['bandwidth']['sent_bytes_per_sec']
+                bandwidth_recv += peer['bandwidth']['recv_bytes_per_sec']
+
+        return PrometheusService.build_summary(
+            total_peers, active_peers, total_sent_bytes, total_recv_bytes,
+            bandwidth_sent, bandwidth_recv
+        )
+
+    @staticmethod
+    def get_peer_history(public_key, duration_hours=1, points=None, downsample=None):
+        """Récupère l'historique de bande passante d'un peer (un dict par point)
+
+        Sans `points`, le pas reste d'une minute jusqu'à
+        HISTORY_LEGACY_MAX_HOURS heures, comme avant le budget de points. Sur
+        une durée plus longue, la réponse est limitée à
+        HISTORY_LEGACY_MAX_POINTS points (pas élargi en conséquence), pour
+        ne pas renvoyer un dict par minute sur 30 jours.
+        """
+        columns = PrometheusService._fetch_history(public_key, duration_hours, points, downsample)
+        if columns is None:
             return None
         
-        # Extraction des données
-        sent_bytes = 0
-        recv_bytes = 0
-        handshake_ts = 0
-        allowed_ips = ""
-        interface = ""
-        
-        if sent_result['data']['result']:
-            sent_bytes = int(sent_result['data']['result'][0]['value'][1])
-            allowed_ips = sent_result['data']['result'][0]['metric'].get('allowed_ips', '')
-            interface = sent_result['data']['result'][0]['metric'].get('interface', '')
-        
-        if recv_result['data']['result']:
-            recv_bytes = int(recv_result['data']['result'][0]['value'][1])
+        history = []
+        for ts, sent_bps, recv_bps in zip(
+            columns['timestamps'], columns['sent_bytes_per_sec'], columns['recv_bytes_per_sec']
+        ):
+            history.append({
+                'timestamp': ts,
+                'datetime': datetime.fromtimestamp(ts).isoformat(),
+                'sent_bytes_per_sec': round(sent_bps, 2),
+                'recv_bytes_per_sec': round(recv_bps, 2),
+                'sent_kbps': round(sent_bps / 1024, 2),
+                'recv_kbps': round(recv_bps / 1024, 2),
+                'sent_mbps': round(sent_bps * 8 / 1024 / 1024, 3),
+                'recv_mbps': round(recv_bps * 8 / 1024 / 1024, 3)
+            })
         
-        if handshake_result['data']['result']:
-            handshake_ts = int(handshake_result['data']['result'][0]['value'][1])
+        return history
+    
+    @staticmethod
+    def get_peer_history_columns(public_key, duration_hours=1, points=HISTORY_DEFAULT_POINTS, downsample=None):
+        """Récupère l'historique de bande passante d'un peer en colonnes compactes
+
+        Le pas est choisi pour rester sous `points` points sur la durée. Avec
+        downsample ('lttb' ou 'minmax'), la série est demandée à une
+        résolution HISTORY_OVERSAMPLING fois plus fine puis réduite à
+        `points` points en gardant sa forme et ses pics. Retourne un dict
+        {step, downsample, timestamps, sent_bytes_per_sec, recv_bytes_per_sec}
+        (débits arrondis à l'octet par seconde) ou None si Prometheus n'a pas
+        pu répondre.
+        """
+        columns = PrometheusService._fetch_history(public_key, duration_hours, points, downsample)
+        if columns is None:
+            return None
         
+        return dict(
+            columns,
+            sent_bytes_per_sec=[round(value) for value in columns['sent_bytes_per_sec']],
+            recv_bytes_per_sec=[round(value) for value in columns['recv_bytes_per_sec']]
+        )
+    
+    @staticmethod
+    def history_step(duration, points):
+        """Plus petit pas « rond » donnant au plus `points` points sur `duration` secondes"""
+        wanted = max(PROMETHEUS_SCRAPE_INTERVAL, math.ceil(duration / max(1, points)))
+        for step in HISTORY_STEPS:
+            if step >= wanted:
+                return step
+        return wanted
+    
+    @staticmethod
+    def check_prometheus_health():
+        """Vérifie la santé de Prometheus (et met à jour le disjoncteur)"""
+        healthy = _probe_prometheus()
+        PrometheusService._breaker.record_health(healthy)
+        return healthy
+
+
+    # ===== HELPERS =====
+
+    @staticmethod
+    def _fetch_history(public_key, duration_hours, points, downsample):
+        """Colonnes de l'historique d'un peer (débits en float), ou None"""
+        end = int(time.time())
+        duration = int(duration_hours * 3600)
+        start = end - duration
+
+        if points is None and duration_hours > HISTORY_LEGACY_MAX_HOURS:
+            points = HISTORY_LEGACY_MAX_POINTS
+        if points is None:
+            step = HISTORY_LEGACY_STEP
+        else:
+            fetch_points = points * HISTORY_OVERSAMPLING if downsample else points
+            step = PrometheusService.history_step(duration, min(fetch_points, PROMETHEUS_MAX_POINTS))
+        # Fenêtre du rate() au moins égale au pas, pour ne sauter aucun échantillon
+        window = max(300, step)
+
+        sent_result, recv_result = PrometheusService.query_range_many([
+            # Historique d'envoi
+            f'rate(wireguard_sent_bytes_total{{public_key="{public_key}"}}[{window}s])',
+            # Historique de réception
+            f'rate(wireguard_received_bytes_total{{public_key="{public_key}"}}[{window}s])'
+        ], start, end, f'{step}s')
+
+        if 'error' in sent_result or 'error' in recv_result:
+            return None
+
+        sent_data = PrometheusService._range_values(sent_result)
+        recv_data = PrometheusService._range_values(recv_result)
+
+        # Combiner les données sur les mêmes horodatages
+        timestamps = sorted(sent_data.keys() | recv_data.keys())
+        sent = [sent_data.get(ts, 0) for ts in timestamps]
+        recv = [recv_data.get(ts, 0) for ts in timestamps]
+
+        if points is not None and len(timestamps) > points:
+            if downsample:
+                # Les deux séries gardent les mêmes points, choisis sur le trafic total
+                total = [sent_bps + recv_bps for sent_bps, recv_bps in zip(sent, recv)]
+                if downsample == 'lttb':
+                    indices = lttb_indices(timestamps, total, points)
+                else:
+                    indices = minmax_indices(total, points)
+                timestamps = [timestamps[i] for i in indices]
+                sent = [sent[i] for i in indices]
+                recv = [recv[i] for i in indices]
+            else:
+                # La plage de Prometheus inclut ses deux bornes : écarter le point en trop
+                timestamps, sent, recv = timestamps[-points:], sent[-points:], recv[-points:]
+
+        return {
+            'step': step,
+            'downsample': downsample,
+            'timestamps': timestamps,
+            'sent_bytes_per_sec': sent,
+            'recv_bytes_per_sec': recv
+        }
+
+    @staticmethod
+    def _range_values(result):
+        """Valeurs de la première série d'une matrice : timestamp -> float"""
+        if result.get('status') != 'success' or not result['data']['result']:
+            return {}
+        return {ts: float(value) for ts, value in result['data']['result'][0]['values']}
+
+    @staticmethod
+    def _index_by_public_key(result):
+        """Indexe un vecteur instantané par public_key -> (labels, valeur)"""
+        if 'error' in result or result.get('status') != 'success':
+            return {}
+
+        indexed = {}
+        for metric in result['data']['result']:
+            labels = metric['metric']
+            indexed[labels.get('public_key', '')] = (labels, float(metric['value'][1]))
+        return indexed
+
+    @staticmethod
+    def build_peer_stats(public_key, sent_bytes, recv_bytes, handshake_ts, interface, allowed_ips):
+        """Construit le dict de statistiques d'un peer"""
         # Calcul du statut (actif si handshake < 3 minutes)
         current_time = datetime.now().timestamp()
         is_active = (current_time - handshake_ts) < 180 if handshake_ts > 0 else False
@@ -116,7 +428,7 @@ class PrometheusService:
                 minutes = (seconds_since % 3600) // 60
                 time_since_handshake = f"{hours}h {minutes}m"
         
-        stats = {
+        return {
             'public_key': public_key,
             'interface': interface,
             'allowed_ips': allowed_ips,
@@ -132,133 +444,25 @@ class PrometheusService:
             'is_active': is_active,
             'status': 'active' if is_active else 'inactive'
         }
-        
-        return stats
-    
-    @staticmethod
-    def get_peer_bandwidth(public_key=None):
-        """Récupère la bande passante actuelle (bytes/sec sur 5 minutes)"""
-        # Si un public_key est spécifié, filtrer pour ce peer
-        if public_key:
-            sent_rate_query = f'rate(wireguard_sent_bytes_total{{public_key="{public_key}"}}[5m])'
-            recv_rate_query = f'rate(wireguard_received_bytes_total{{public_key="{public_key}"}}[5m])'
-        else:
-            sent_rate_query = 'rate(wireguard_sent_bytes_total[5m])'
-            recv_rate_query = 'rate(wireguard_received_bytes_total[5m])'
-        
-        sent_rate = PrometheusService.query(sent_rate_query)
-        recv_rate = PrometheusService.query(recv_rate_query)
-        
-        if 'error' in sent_rate or 'error' in recv_rate:
-            return None if public_key else []
-        
-        bandwidth_list = []
-        
-        if sent_rate['data']['result']:
-            for metric in sent_rate['data']['result']:
-                peer_key = metric['metric']['public_key']
-                sent_bps = float(metric['value'][1])
-                
-                # Trouver le taux de réception correspondant
-                recv_bps = 0
-                if recv_rate['data']['result']:
-                    for recv_metric in recv_rate['data']['result']:
-                        if recv_metric['metric']['public_key'] == peer_key:
-                            recv_bps = float(recv_metric['value'][1])
-                            break
-                
-                bandwidth_list.append({
-                    'public_key': peer_key,
-                    'sent_bytes_per_sec': round(sent_bps, 2),
-                    'recv_bytes_per_sec': round(recv_bps, 2),
-                    'total_bytes_per_sec': round(sent_bps + recv_bps, 2),
-                    'sent_kbps': round(sent_bps / 1024, 2),
-                    'recv_kbps': round(recv_bps / 1024, 2),
-                    'sent_mbps': round(sent_bps * 8 / 1024 / 1024, 3),
-                    'recv_mbps': round(recv_bps * 8 / 1024 / 1024, 3)
-                })
-        
-        # Si on cherche un peer spécifique, retourner uniquement ses données
-        if public_key:
-            for bw in bandwidth_list:
-                if bw['public_key'] == public_key:
-                    return bw
-            return None
-        
-        return bandwidth_list
-    
+
     @staticmethod
-    def get_active_peers():
-        """Récupère uniquement les peers actifs (handshake < 3 minutes)"""
-        query = '(time() - wireguard_latest_handshake_seconds) < 180'
-        result = PrometheusService.query(query)
-        
-        if 'error' in result or result.get('status') != 'success':
-            return []
-        
-        active_peers = []
-        for metric in result['data']['result']:
-            active_peers.append({
-                'public_key': metric['metric'].get('public_key', ''),
-                'interface': metric['metric'].get('interface', ''),
-                'allowed_ips': metric['metric'].get('allowed_ips', '')
-            })
-        
-        return active_peers
-    
+    def build_bandwidth(public_key, sent_bps, recv_bps):
+        """Construit le dict de bande passante d'un peer"""
+        return {
+            'public_key': public_key,
+            'sent_bytes_per_sec': round(sent_bps, 2),
+            'recv_bytes_per_sec': round(recv_bps, 2),
+            'total_bytes_per_sec': round(sent_bps + recv_bps, 2),
+            'sent_kbps': round(sent_bps / 1024, 2),
+            'recv_kbps': round(recv_bps / 1024, 2),
+            'sent_mbps': round(sent_bps * 8 / 1024 / 1024, 3),
+            'recv_mbps': round(recv_bps * 8 / 1024 / 1024, 3)
+        }
+
     @staticmethod
-    def get_summary():
-        """Récupère un résumé global du VPN"""
-        # Nombre total de peers
-        total_peers_query = 'count(wireguard_sent_bytes_total)'
-        total_peers_result = PrometheusService.query(total_peers_query)
-        
-        # Peers actifs
-        active_peers_query = 'count((time() - wireguard_latest_handshake_seconds) < 180)'
-        active_peers_result = PrometheusService.query(active_peers_query)
-        
-        # Total données envoyées
-        total_sent_query = 'sum(wireguard_sent_bytes_total)'
-        total_sent_result = PrometheusService.query(total_sent_query)
-        
-        # Total données reçues
-        total_recv_query = 'sum(wireguard_received_bytes_total)'
-        total_recv_result = PrometheusService.query(total_recv_query)
-        
-        # Bande passante actuelle totale
-        total_bandwidth_sent_query = 'sum(rate(wireguard_sent_bytes_total[5m]))'
-        total_bandwidth_sent_result = PrometheusService.query(total_bandwidth_sent_query)
-        
-        total_bandwidth_recv_query = 'sum(rate(wireguard_received_bytes_total[5m]))'
-        total_bandwidth_recv_result = PrometheusService.query(total_bandwidth_recv_query)
-        
-        # Extraction des valeurs
-        total_peers = 0
-        active_peers = 0
-        total_sent_bytes = 0
-        total_recv_bytes = 0
-        bandwidth_sent = 0
-        bandwidth_recv = 0
-        
-        if total_peers_result.get('status') == 'success' and total_peers_result['data']['result']:
-            total_peers = int(total_peers_result['data']['result'][0]['value'][1])
-        
-        if active_peers_result.get('status') == 'success' and active_peers_result['data']['result']:
-            active_peers = int(active_peers_result['data']['result'][0]['value'][1])
-        
-        if total_sent_result.get('status') == 'success' and total_sent_result['data']['result']:
-            total_sent_bytes = int(total_sent_result['data']['result'][0]['value'][1])
-        
-        if total_recv_result.get('status') == 'success' and total_recv_result['data']['result']:
-            total_recv_bytes = int(total_recv_result['data']['result'][0]['value'][1])
-        
-        if total_bandwidth_sent_result.get('status') == 'success' and total_bandwidth_sent_result['data']['result']:
-            bandwidth_sent = float(total_bandwidth_sent_result['data']['result'][0]['value'][1])
-        
-        if total_bandwidth_recv_result.get('status') == 'success' and total_bandwidth_recv_result['data']['result']:
-            bandwidth_recv = float(total_bandwidth_recv_result['data']['result'][0]['value'][1])
-        
-        summary = {
+    def build_summary(total_peers, active_peers, total_sent_bytes, total_recv_bytes, bandwidth_sent, bandwidth_recv):
+        """Construit le dict de résumé global du VPN"""
+        return {
             'total_peers': total_peers,
             'active_peers': active_peers,
             'inactive_peers': max(0, total_peers - active_peers),
@@ -271,69 +475,3 @@ class PrometheusService:
             'current_bandwidth_recv_mbps': round(bandwidth_recv * 8 / 1024 / 1024, 3),
             'current_bandwidth_total_mbps': round((bandwidth_sent + bandwidth_recv) * 8 / 1024 / 1024, 3)
         }
-        
-        return summary
-    
-    @staticmethod
-    def get_peer_history(public_key, duration_hours=1):
-        """Récupère l'historique de bande passante d'un peer"""
-        import time
-        
-        end = int(time.time())
-        start = end - (duration_hours * 3600)
-        
-        # Historique d'envoi
-        sent_query = f'rate(wireguard_sent_bytes_total{{public_key="{public_key}"}}[5m])'
-        sent_result = PrometheusService.query_range(sent_query, start, end, '1m')
-        
-        # Historique de réception
-        recv_query = f'rate(wireguard_received_bytes_total{{public_key="{public_key}"}}[5m])'
-        recv_result = PrometheusService.query_range(recv_query, start, end, '1m')
-        
-        if 'error' in sent_result or 'error' in recv_result:
-            return None
-        
-        history = []
-        
-        # Traiter les données d'envoi
-        sent_data = {}
-        if sent_result.get('status') == 'success' and sent_result['data']['result']:
-            for value in sent_result['data']['result'][0]['values']:
-                timestamp = value[0]
-                sent_data[timestamp] = float(value[1])
-        
-        # Traiter les données de réception
-        recv_data = {}
-        if recv_result.get('status') == 'success' and recv_result['data']['result']:
-            for value in recv_result['data']['result'][0]['values']:
-                timestamp = value[0]
-                recv_data[timestamp] = float(value[1])
-        
-        # Combiner les données
-        all_timestamps = sorted(set(list(sent_data.keys()) + list(recv_data.keys())))
-        
-        for ts in all_timestamps:
-            sent_bps = sent_data.get(ts, 0)
-            recv_bps = recv_data.get(ts, 0)
-            
-            history.append({
-                'timestamp': ts,
-                'datetime': datetime.fromtimestamp(ts).isoformat(),
-                'sent_bytes_per_sec': round(sent_bps, 2),
-                'recv_bytes_per_sec': round(recv_bps, 2),
-                'sent_kbps': round(sent_bps / 1024, 2),
-                'recv_kbps': round(recv_bps / 1024, 2),
-                'sent_mbps': round(sent_bps * 8 / 1024 / 1024, 3),
-                'recv_mbps': round(recv_bps * 8 / 1024 / 1024, 3)
-            })
-        
-        return history
-    
-    @staticmethod
-    def check_prometheus_health():
-        """Vérifie la santé de Prometheus"""
-        try:
-            response = requests.get(f"{PROMETHEUS_URL}/-/healthy", timeout=5)
-            return response.status_code == 200
-        except:
-            return False
\ No newline at end of file
@@ -0,0 +1,129 @@
+import hashlib
+import io
+import os
+from concurrent.futures import ThreadPoolExecutor
+import qrcode
+import qrcode.image.svg
+from config.settings import WIREGUARD_PATH, QR_CACHE_PATH, QR_CACHE_SIZE, QR_CACHE_TTL, QR_DISK_CACHE_MAX
+from services.config_service import ConfigService
+from services.config_store import ConfigStore
+from utils.cache import TTLCache
+
+QR_FORMATS = {
+    'png': 'image/png',
+    'svg': 'image/svg+xml'
+}
+
+class QRService:
+    """QR codes of the peer configurations
+
+    Images are generated lazily and cached in memory and on disk under the
+    peer name and the SHA-256 of the configuration, so a new key, IP or
+    template gives a new image. The configuration holds the private key of
+    the peer: purge() drops every image of a deleted peer.
+    """
+    _memory = TTLCache(QR_CACHE_TTL, QR_CACHE_SIZE)
+    _executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix='qr-warm')
+    _writes = 0
+
+    @staticmethod
+    def get_qr(name, config, fmt='png'):
+        """Return (image bytes, content hash) for the configuration of a peer"""
+        if fmt not in QR_FORMATS:
+            raise ValueError(f"Unsupported QR format: {fmt}")
+        digest = hashlib.sha256(config.encode('utf-8')).hexdigest()
+        image = QRService._memory.get_or_load(
+            (name, digest, fmt), lambda: QRService._load(f"{name}.{digest}.{fmt}", config, fmt)
+        )
+        return image, digest
+
+    @staticmethod
+    def get_peer_qr(peer, fmt='png'):
+        """Return (image bytes, content hash) for a peer (registry entry), or None"""
+        config = ConfigService.get_peer_config(peer)
+        if config is None:
+            return None
+        return QRService.get_qr(peer['name'], config, fmt)
+
+    @staticmethod
+    def warm(peers, fmt='png'):
+        """Generate the QR codes of some peers in the background"""
+        def run():
+            for peer in peers:
+                try:
+                    QRService.get_peer_qr(peer, fmt)
+                except Exception as e:
+                    print(f"Warning: could not generate QR code for {peer['name']}: {e}")
+        return QRService._executor.submit(run)
+
+    @staticmethod
+    def purge(names):
+        """Drop the cached images of deleted peers, in memory and on disk"""
+        names = set(names)
+        QRService._memory.discard(lambda key: key[0] in names)
+
+        directory = os.path.join(WIREGUARD_PATH, QR_CACHE_PATH)
+        try:
+            entries = list(os.scandir(directory))
+        except FileNotFoundError:
+            return
+        for entry in entries:
+            parts = entry.name.split('.')
+            # <name>.<digest>.<fmt>, ou <digest>.<fmt> (ancien format, sans nom de peer)
+            if parts[0] in names or len(parts) == 2:
+                try:
+                    os.remove(entry.path)
+                except FileNotFoundError:
+                    pass
+
+    @staticmethod
+    def cache_stats():
+        return QRService._memory.stats()
+
+    # ===== HELPERS =====
+
+    @staticmethod
+    def _load(filename, config, fmt):
+        path = os.path.join(WIREGUARD_PATH, QR_CACHE_PATH, filename)
+        try:
+            with open(path, 'rb') as f:
+                return f.read()
+        except FileNotFoundError:
+            pass
+
+        image = QRService._generate(config, fmt)
+        # La configuration contient la clé privée : fichier lisible par nous seuls
+        ConfigStore.atomic_write(path, image, mode=0o600)
+        QRService._prune_disk_cache()
+        return image
+
+    @staticmethod
+    def _generate(config, fmt):
+        qr = qrcode.QRCode(error_correction=qrcode.constants.ERROR_CORRECT_L, box_size=8, border=2)
+        qr.add_data(config)
+        qr.make(fit=True)
+
+        buffer = io.BytesIO()
+        if fmt == 'svg':
+            qr.make_image(image_factory=qrcode.image.svg.SvgPathImage).save(buffer)
+        else:
+            qr.make_image().save(buffer, format='PNG')
+        return buffer.getvalue()
+
+    @staticmethod
+    def _prune_disk_cache():
+        """Drop the oldest images once the cache exceeds QR_DISK_CACHE_MAX (checked every 100 writes)"""
+        QRService._writes += 1
+        if QRService._writes % 100:
+            return
+
+        directory = os.path.join(WIREGUARD_PATH, QR_CACHE_PATH)
+        entries = [entry for entry in os.scandir(directory) if entry.is_file()]
+        if len(entries) <= QR_DISK_CACHE_MAX:
+            return
+        entries.sort(key=lambda entry: entry.stat().st_mtime)
+        for entry in entries[:len(entries) - QR_DISK_CACHE_MAX]:
+            try:
+                os.remove(entry.path)
+            except FileNotFoundError:
+                pass
@@ -0,0 +1,122 @@
+import threading
+import time
+
+# Délai maximal entre deux nouvelles tentatives après un échec
+RETRY_MAX_DELAY = 60
+
+class ReloadScheduler:
+    """Coalesces configuration changes into a single apply to the live interface
+
+    Each mutation calls mark_dirty() with its delta and gets a version number.
+    A background worker waits `window` seconds after the first pending change,
+    merges every delta received meanwhile and applies them in one call to
+    `apply(added, removed)`, which must return (success, mode).
+    A failed delta stays pending and is retried with the next changes, with
+    an exponential backoff; waiters of the failed versions are released.
+    """
+
+    def __init__(self, apply, window=1.0):
+        self.apply = apply
+        self.window = window
+        self.version = 0
+        self.applied_version = 0
+        self.completed_version = 0
+        self.failed_version = 0
+        self.failures = 0
+        self.last_error = None
+        self.last_mode = None
+        self.last_applied_at = None
+        self._added = {}    # name -> peer section
+        self._removed = {}  # public key -> peer section
+        self._condition = threading.Condition()
+        self._worker = None
+
+    def mark_dirty(self, added=(), removed=()):
+        """Record a change to apply, return its version"""
+        with self._condition:
+            self._merge(added, removed)
+            self.version += 1
+            self._ensure_worker()
+            self._condition.notify_all()
+            return self.version
+
+    def wait(self, version, timeout=None):
+        """Wait until `version` has been applied, return True if it was applied successfully"""
+        deadline = time.monotonic() + timeout if timeout is not None else None
+        with self._condition:
+            while self.completed_version < version and self.failed_version < version:
+                remaining = deadline - time.monotonic() if deadline is not None else None
+                if remaining is not None and remaining <= 0:
+                    return False
+                self._condition.wait(remaining)
+            return self.applied_version >= version
+
+    def status(self):
+        with self._condition:
+            return {
+                'pending': self.version > self.completed_version,
+                'version': self.version,
+                'applied_version': self.applied_version,
+                'pending_added': len(self._added),
+                'pending_removed': len(self._removed),
+                'failures': self.failures,
+                'last_mode': self.last_mode,
+                'last_error': self.last_error,
+                'last_applied_at': self.last_applied_at,
+                'window_seconds': self.window
+            }
+
+    def _ensure_worker(self):
+        if self._worker is None or not self._worker.is_alive():
+            self._worker = threading.Thread(target=self._run, name='wireguard-reload')
+            self._worker.daemon = True
+            self._worker.start()
+
+    def _run(self):
+        while True:
+            with self._condition:
+                while self.version == self.completed_version:
+                    self._condition.wait()
+
+            # Laisser les autres modifications arriver pendant la fenêtre (plus longtemps après un échec)
+            time.sleep(min(self.window * 2 ** self.failures, RETRY_MAX_DELAY) if self.failures else self.window)
+
+            with self._condition:
+                version = self.version
+                added = list(self._added.values())
+                removed = list(self._removed.values())
+                self._added = {}
+                self._removed = {}
+
+            try:
+                success, mode = self.apply(added, removed)
+                error = None if success else f"apply failed (mode {mode})"
+            except Exception as e:
+                success, mode, error = False, None, str(e)
+
+            with self._condition:
+                self.last_mode = mode
+                self.last_error = error
+                if success:
+                    self.completed_version = version
+                    self.applied_version = version
+                    self.last_applied_at = time.time()
+                    self.failures = 0
+                else:
+                    # Remettre le delta en attente, sous les modifications arrivées depuis
+                    pending_added, pending_removed = self._added, self._removed
+                    self._added = {peer['name']: peer for peer in added}
+                    self._removed = {peer['public_key']: peer for peer in removed}
+                    self._merge(pending_added.values(), pending_removed.values())
+                    self.failed_version = version
+                    self.failures += 1
+                self._condition.notify_all()
+
+    def _merge(self, added, removed):
+        for peer in removed:
+            # Un peer ajouté puis supprimé dans la même fenêtre n'a pas à être ajouté
+            self._added.pop(peer['name'], None)
+            self._removed[peer['public_key']] = peer
+        for peer in added:
+            self._removed.pop(peer['public_key'], None)
+            self._added[peer['name']] = peer
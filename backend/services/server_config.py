@@ -0,0 +1,147 @@
+class ServerConfig:
+    """Parsed model of the server wg0.conf
+
+    Holds the [Interface] section as raw lines and the [Peer] sections in an
+    ordered dict keyed by peer name (the `# name` comment written under
+    [Peer]), with a second index by public key. Peers without a name comment
+    are keyed by their public key.
+    """
+
+    def __init__(self, interface_lines=None):
+        self.interface_lines = interface_lines if interface_lines is not None else ['[Interface]']
+        self._peers = {}          # name -> peer dict, in file order
+        self._by_public_key = {}  # public key -> name
+
+    @staticmethod
+    def parse(text):
+        """Build a ServerConfig from the content of wg0.conf"""
+        config = ServerConfig([])
+        section = None
+        current = None
+
+        for raw_line in text.splitlines():
+            line = raw_line.strip()
+
+            if line.startswith('['):
+                if current is not None:
+                    config._insert(current)
+                    current = None
+                section = line
+                if section == '[Peer]':
+                    current = {'name': None, 'public_key': None, 'preshared_key': None,
+                               'allowed_ips': None, 'extra': []}
+                else:
+                    config.interface_lines.append(raw_line)
+                continue
+
+            if current is None:
+                config.interface_lines.append(raw_line)
+            elif not line:
+                continue
+            elif line.startswith('#') and current['name'] is None and current['public_key'] is None:
+                current['name'] = line[1:].strip()
+            elif '=' in line and not line.startswith('#'):
+                key, value = (part.strip() for part in line.split('=', 1))
+                field = {'PublicKey': 'public_key', 'PresharedKey': 'preshared_key',
+                         'AllowedIPs': 'allowed_ips'}.get(key)
+                if field:
+                    current[field] = value
+                else:
+                    current['extra'].append(line)
+            else:
+                current['extra'].append(line)
+
+        if current is not None:
+            config._insert(current)
+
+        while config.interface_lines and not config.interface_lines[-1].strip():
+            config.interface_lines.pop()
+        return config
+
+    def serialize(self):
+        """Render the model back to the wg0.conf format"""
+        blocks = ['\n'.join(self.interface_lines)]
+        for peer in self._peers.values():
+            lines = ['[Peer]']
+            if peer['name'] and peer['name'] != peer['public_key']:
+                lines.append(f"# {peer['name']}")
+            lines.append(f"PublicKey = {peer['public_key']}")
+            if peer['preshared_key']:
+                lines.append(f"PresharedKey = {peer['preshared_key']}")
+            if peer['allowed_ips']:
+                lines.append(f"AllowedIPs = {peer['allowed_ips']}")
+            lines.extend(peer['extra'])
+            blocks.append('\n'.join(lines))
+        return '\n\n'.join(blocks) + '\n'
+
+    def peers(self):
+        """Iterate over the peer sections in file order"""
+        return iter(self._peers.values())
+
+    def copy_peers(self, names=None):
+        """Copies of the peer sections (all of them, or those of `names` that exist), in order"""
+        if names is None:
+            peers = self._peers.values()
+        else:
+            peers = (self._peers[name] for name in names if name in self._peers)
+        return [dict(peer, extra=list(peer['extra'])) for peer in peers]
+
+    def __len__(self):
+        return len(self._peers)
+
+    def __contains__(self, name):
+        return name in self._peers
+
+    def get(self, name):
+        return self._peers.get(name)
+
+    def get_by_public_key(self, public_key):
+        name = self._by_public_key.get(public_key)
+        return self._peers.get(name) if name is not None else None
+
+    def add_peer(self, name, public_key, preshared_key, allowed_ips):
+        """Append a [Peer] section, raise ValueError if the name or key is taken"""
+        if name in self._peers:
+            raise ValueError(f"Peer {name} already exists in server configuration")
+        if public_key in self._by_public_key:
+            raise ValueError(f"Public key already used by peer {self._by_public_key[public_key]}")
+
+        peer = {'name': name, 'public_key': public_key, 'preshared_key': preshared_key,
+                'allowed_ips': allowed_ips, 'extra': []}
+        self._insert(peer)
+        return peer
+
+    def remove_peer(self, name):
+        """Remove a [Peer] section, return it or None if it does not exist"""
+        peer = self._peers.pop(name, None)
+        if peer is not None and self._by_public_key.get(peer['public_key']) == name:
+            del self._by_public_key[peer['public_key']]
+        return peer
+
+    def update_peer(self, name, **fields):
+        """Update public_key, preshared_key and/or allowed_ips of a peer"""
+        peer = self._peers.get(name)
+        if peer is None:
+            raise KeyError(name)
+
+        new_key = fields.get('public_key')
+        if new_key and new_key != peer['public_key']:
+            if new_key in self._by_public_key:
+                raise ValueError(f"Public key already used by peer {self._by_public_key[new_key]}")
+            self._by_public_key.pop(peer['public_key'], None)
+            self._by_public_key[new_key] = name
+
+        for field in ('public_key', 'preshared_key', 'allowed_ips'):
+            if field in fields:
+                peer[field] = fields[field]
+        return peer
+
+    def _insert(self, peer):
+        if peer['name'] is None:
+            peer['name'] = peer['public_key']
+        if peer['name'] in self._peers:
+            # Deux sections du même nom : la seconde écraserait la première et serait perdue au prochain enregistrement
+            raise ValueError(f"Duplicate peer name in server configuration: {peer['name']}")
+        self._peers[peer['name']] = peer
+        if peer['public_key']:
+            self._by_public_key[peer['public_key']] = peer['name']
@@ -0,0 +1,89 @@
+import time
+from config.settings import WIREGUARD_INTERFACE, METRICS_POLL_INTERVAL
+from services.prometheus_service import PrometheusService
+from services.wireguard_service import WireGuardService
+from utils.cache import TTLCache
+from utils.rates import CounterRates
+
+class WgDumpService:
+    """Peer metrics read from `wg show <interface> dump` in the WireGuard container
+
+    Same interface as PrometheusService for the metrics collector
+    (get_fleet_metrics, is_stale), for deployments without Prometheus or
+    the exporter. The command runs through the container returned by
+    WireGuardService.get_container(); its output is parsed in one pass and
+    cached for one collection interval. Rates are computed from the
+    counters of two consecutive dumps.
+    """
+    _cache = TTLCache(METRICS_POLL_INTERVAL, 1)
+    _rates = CounterRates()
+    _last_error = None
+
+    @staticmethod
+    def get_fleet_metrics():
+        """Return public_key -> {'stats': ..., 'bandwidth': ...}, or None if wg could not be run"""
+        try:
+            sampled_at, peers = WgDumpService._cache.get_or_load('dump', WgDumpService.dump)
+        except Exception as e:
+            print(f"Error reading wg dump: {e}")
+            WgDumpService._last_error = str(e)
+            return None
+        WgDumpService._last_error = None
+
+        rates = WgDumpService._rates.update(
+            sampled_at, {key: (peer['sent_bytes'], peer['received_bytes']) for key, peer in peers.items()}
+        )
+
+        fleet = {}
+        for public_key, peer in peers.items():
+            stats = PrometheusService.build_peer_stats(
+                public_key, peer['sent_bytes'], peer['received_bytes'], peer['latest_handshake'],
+                WIREGUARD_INTERFACE, peer['allowed_ips']
+            )
+            fleet[public_key] = {
+                'stats': dict(stats, endpoint=peer['endpoint']),
+                'bandwidth': (
+                    PrometheusService.build_bandwidth(public_key, *rates[public_key])
+                    if public_key in rates else None
+                )
+            }
+        return fleet
+
+    @staticmethod
+    def dump(container=None):
+        """Run `wg show dump` in the container, return (time, parsed peers)"""
+        container = container or WireGuardService.get_container()
+        result = container.exec_run(["wg", "show", WIREGUARD_INTERFACE, "dump"])
+        if result.exit_code != 0:
+            raise RuntimeError(result.output.decode(errors='replace').strip())
+        return time.time(), WgDumpService.parse(result.output.decode())
+
+    @staticmethod
+    def parse(output):
+        """Parse the output of `wg show <interface> dump`
+
+        The first line describes the interface; every other line is a peer:
+        public key, preshared key, endpoint, allowed IPs, latest handshake,
+        rx bytes, tx bytes, persistent keepalive. Returns public_key ->
+        {endpoint, allowed_ips, latest_handshake, received_bytes, sent_bytes},
+        where sent/received are seen from the server like the exporter's.
+        """
+        peers = {}
+        for line in output.splitlines()[1:]:
+            fields = line.split('\t')
+            if len(fields) < 8:
+                continue
+            public_key, _, endpoint, allowed_ips, handshake, rx, tx, _ = fields[:8]
+            peers[public_key] = {
+                'endpoint': endpoint if endpoint != '(none)' else None,
+                'allowed_ips': allowed_ips if allowed_ips != '(none)' else '',
+                'latest_handshake': int(handshake),
+                'received_bytes': int(rx),
+                'sent_bytes': int(tx)
+            }
+        return peers
+
+    @staticmethod
+    def is_stale():
+        """True when the last dump failed"""
+        return WgDumpService._last_error is not None
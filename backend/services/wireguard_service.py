@@ -1,75 +1,257 @@
 import os
 import subprocess
+import threading
 import docker
-from config.settings import WIREGUARD_PATH, DOCKER_CONTAINER_NAME, SERVER_CONFIG_PATH
+from config.settings import (
+    WIREGUARD_PATH, DOCKER_CONTAINER_NAME, SERVER_CONFIG_PATH, PEER_IP_RANGE,
+    PEER_IP_PREFIX, PEER_IP_START, PEER_IP_MAX_HOSTS, IP_ALLOCATOR_STATE_PATH,
+    WIREGUARD_INTERFACE, WIREGUARD_CONTAINER_CONFIG_PATH, WIREGUARD_APPLY_MODE,
+    WIREGUARD_RELOAD_WINDOW, APPLY_STAGING_PATH
+)
+from services.config_store import ConfigStore
+from services.ip_allocator import IPAllocator
+from services.reload_scheduler import ReloadScheduler
+from services.server_config import ServerConfig
 
 class WireGuardService:
-    # Initialiser le client Docker
-    _docker_client = docker.from_env()
+    # Client Docker, initialisé à la première utilisation
+    _docker_client = None
+
+    # Modèle de wg0.conf gardé en mémoire entre les requêtes
+    _server_config = None
+    _server_config_mtime = None
+    _config_lock = threading.RLock()
+    _ip_allocator = None
+
+    # Regroupe les modifications rapprochées en une seule application
+    _reload_scheduler = ReloadScheduler(
+        lambda added, removed: WireGuardService.apply_peer_changes(added, removed),
+        WIREGUARD_RELOAD_WINDOW
+    )
+
+    @staticmethod
+    def schedule_apply(added=(), removed=()):
+        """Mark the configuration dirty, return the version to wait for"""
+        return WireGuardService._reload_scheduler.mark_dirty(added, removed)
+
+    @staticmethod
+    def wait_applied(version, timeout=None):
+        """Wait until a scheduled change is applied, return True on success"""
+        return WireGuardService._reload_scheduler.wait(version, timeout)
+
+    @staticmethod
+    def reload_status():
+        """Return the state of the reload scheduler"""
+        return WireGuardService._reload_scheduler.status()
 
     @staticmethod
-    def add_peer_to_server_config(peer_name, peer_public_key, preshared_key):
+    def get_server_config():
+        """Return the in-memory wg0.conf model, reloaded only if the file changed on disk
+
+        The model is shared and mutated by the writers: use it only while
+        holding _config_lock, and read peers through get_server_peers().
+        Raises ValueError if two [Peer] sections have the same name.
+        """
+        server_config_path = os.path.join(WIREGUARD_PATH, SERVER_CONFIG_PATH)
+        with WireGuardService._config_lock:
+            mtime = os.stat(server_config_path).st_mtime_ns
+            if WireGuardService._server_config is None or mtime != WireGuardService._server_config_mtime:
+                with open(server_config_path, 'r') as f:
+                    WireGuardService._server_config = ServerConfig.parse(f.read())
+                WireGuardService._server_config_mtime = mtime
+            return WireGuardService._server_config
+
+    @staticmethod
+    def get_server_peers(names=None):
+        """Return copies of the committed peer sections (all, or those of `names`)"""
+        with WireGuardService._config_lock:
+            return WireGuardService.get_server_config().copy_peers(names)
+
+    @staticmethod
+    def save_server_config(server_config, writes=None, deletes=None):
+        """Write the wg0.conf model back to disk
+
+        `writes` ({path: content}) and `deletes` (paths) are committed in the
+        same journaled transaction, so peer files and wg0.conf never diverge.
+        """
+        server_config_path = os.path.join(WIREGUARD_PATH, SERVER_CONFIG_PATH)
+        files = {server_config_path: server_config.serialize()}
+        files.update(writes or {})
+        with ConfigStore.transaction(), WireGuardService._config_lock:
+            try:
+                ConfigStore.commit(writes=files, deletes=deletes)
+            except Exception:
+                # Le modèle en mémoire a pu diverger du fichier : forcer un rechargement
+                WireGuardService._server_config = None
+                WireGuardService._ip_allocator = None
+                raise
+            WireGuardService._server_config = server_config
+            WireGuardService._server_config_mtime = os.stat(server_config_path).st_mtime_ns
+
+            # L'allocateur reste synchronisé avec le fichier qui vient d'être écrit
+            allocator = WireGuardService._ip_allocator
+            if allocator is not None:
+                allocator.config_mtime = WireGuardService._server_config_mtime
+                allocator.save(os.path.join(WIREGUARD_PATH, IP_ALLOCATOR_STATE_PATH))
+
+    @staticmethod
+    def get_ip_allocator():
+        """Return the peer IP allocator, rebuilt from wg0.conf if it is out of date"""
+        state_path = os.path.join(WIREGUARD_PATH, IP_ALLOCATOR_STATE_PATH)
+        network = f"{PEER_IP_RANGE}/{PEER_IP_PREFIX}"
+        with WireGuardService._config_lock:
+            server_config = WireGuardService.get_server_config()
+            config_mtime = WireGuardService._server_config_mtime
+
+            allocator = WireGuardService._ip_allocator
+            if allocator is None:
+                allocator = IPAllocator.load(state_path, network, PEER_IP_START, PEER_IP_MAX_HOSTS)
+
+            # État absent ou wg0.conf modifié hors de l'API : reconstruire depuis les AllowedIPs
+            if allocator is None or allocator.config_mtime != config_mtime:
+                allocator = IPAllocator.from_server_config(
+                    server_config, network, PEER_IP_START, PEER_IP_MAX_HOSTS
+                )
+                allocator.config_mtime = config_mtime
+                allocator.save(state_path)
+
+            WireGuardService._ip_allocator = allocator
+            return allocator
+
+    @staticmethod
+    def add_peer_to_server_config(peer_name, peer_public_key, preshared_key, peer_files=None):
         """Add the peer to the server configuration"""
+        return WireGuardService.add_peers_to_server_config(
+            [(peer_name, peer_public_key, preshared_key)], peer_files
+        )[0]
+
+    @staticmethod
+    def add_peers_to_server_config(peers, peer_files=None):
+        """Add several peers to the server configuration with a single write
+
+        `peers` is a list of (name, public_key, preshared_key) tuples. Returns
+        the assigned IPs in the same order. If one peer cannot be added, none is.
+        `peer_files(name, ip)` may return the {path: content} of the peer
+        files, written in the same transaction as wg0.conf.
+        The change still has to be applied with apply_peer_changes().
+        """
         try:
-            server_conf_path = os.path.join(WIREGUARD_PATH, "wg_confs", "wg0.conf")
-            
-            # Calculate next available IP
-            existing_peers = len([f for f in os.listdir(WIREGUARD_PATH) 
-                                 if os.path.isdir(os.path.join(WIREGUARD_PATH, f)) and f not in ['server', 'templates', 'wg_confs']])
-            peer_ip = f"10.0.3.{existing_peers + 2}"
-            
-            # Peer configuration to add to server
-            peer_config = f"""
-[Peer]
-# {peer_name}
-PublicKey = {peer_public_key}
-PresharedKey = {preshared_key}
-AllowedIPs = {peer_ip}/32
-"""
-            
-            # Read current server config
-            with open(server_conf_path, "r") as f:
-                current_config = f.read()
-            
-            # Find the position to insert
-            if current_config.strip().endswith(']'):
-                lines = current_config.split('\n')
-                new_lines = []
-                for line in lines:
-                    if line.strip() == ']' and peer_config not in current_config:
-                        new_lines.append(peer_config)
-                        new_lines.append(']')
-                    else:
-                        new_lines.append(line)
-                new_config = '\n'.join(new_lines)
-            else:
-                new_config = current_config + peer_config
-            
-            # Write updated server configuration
-            with open(server_conf_path, "w") as f:
-                f.write(new_config)
-            
-            # Reload WireGuard configuration
-            WireGuardService.reload_wireguard_config()
+            with ConfigStore.transaction(), WireGuardService._config_lock:
+                server_config = WireGuardService.get_server_config()
+                allocator = WireGuardService.get_ip_allocator()
+                
+                peer_ips = []
+                added = []
+                try:
+                    for peer_name, peer_public_key, preshared_key in peers:
+                        # Allocate the next free IP of the peer subnet
+                        ip = allocator.allocate()
+                        peer_ips.append(str(ip))
+                        server_config.add_peer(peer_name, peer_public_key, preshared_key, f"{ip}/{ip.max_prefixlen}")
+                        added.append(peer_name)
+                    
+                    writes = {}
+                    if peer_files is not None:
+                        for (peer_name, _, _), peer_ip in zip(peers, peer_ips):
+                            writes.update(peer_files(peer_name, peer_ip))
+                    WireGuardService.save_server_config(server_config, writes=writes)
+                except Exception:
+                    # Annuler les ajouts déjà faits dans le modèle en mémoire, jusqu'à l'écriture comprise
+                    for peer_name in added:
+                        server_config.remove_peer(peer_name)
+                    for peer_ip in peer_ips:
+                        allocator.release(peer_ip)
+                    raise
             
-            return peer_ip
+            return peer_ips
             
         except Exception as e:
             print(f"Error adding peer to server: {e}")
-            return f"192.0.0.{existing_peers + 2}"
+            raise
+
+    @staticmethod
+    def get_container():
+        """Return the WireGuard container (any object with exec_run() and restart())"""
+        if WireGuardService._docker_client is None:
+            WireGuardService._docker_client = docker.from_env()
+        return WireGuardService._docker_client.containers.get(DOCKER_CONTAINER_NAME)
+
+    @staticmethod
+    def apply_peer_changes(added=(), removed=(), container=None):
+        """Apply peer changes to the live interface without dropping the other tunnels
+
+        `added` is a list of peer sections (dicts with name, public_key and
+        allowed_ips) whose files are already written, `removed` a list of
+        removed peer sections. Depending on WIREGUARD_APPLY_MODE, the delta is
+        sent with targeted `wg set` commands ('incremental'), the whole file is
+        synced ('syncconf'), or the container is restarted ('restart').
+        An incremental apply that fails falls back to syncconf.
+
+        Returns (success, mode actually used).
+        """
+        try:
+            container = container or WireGuardService.get_container()
+        except Exception as e:
+            print(f"Error getting WireGuard container: {e}")
+            return False, WIREGUARD_APPLY_MODE
+
+        if WIREGUARD_APPLY_MODE == 'restart':
+            success, message = WireGuardService.restart_wireguard_container(container)
+            print(message)
+            return success, 'restart'
+
+        if WIREGUARD_APPLY_MODE == 'incremental':
+            commands = []
+            staged = []
+            for peer in removed:
+                commands.append(["wg", "set", WIREGUARD_INTERFACE, "peer", peer['public_key'], "remove"])
+
+            try:
+                for peer in added:
+                    psk_file = f"{peer['name']}/presharedkey-{peer['name']}"
+                    if not os.path.exists(os.path.join(WIREGUARD_PATH, psk_file)):
+                        # Pas de répertoire pour ce peer (stockage SQLite) : déposer la clé le temps du wg set
+                        psk_file = f"{APPLY_STAGING_PATH}/{peer['name']}"
+                        ConfigStore.atomic_write(
+                            os.path.join(WIREGUARD_PATH, psk_file), peer['preshared_key'] or '', mode=0o600
+                        )
+                        staged.append(os.path.join(WIREGUARD_PATH, psk_file))
+                    commands.append([
+                        "wg", "set", WIREGUARD_INTERFACE, "peer", peer['public_key'],
+                        "preshared-key", f"{WIREGUARD_CONTAINER_CONFIG_PATH}/{psk_file}",
+                        "allowed-ips", peer['allowed_ips']
+                    ])
+
+                for command in commands:
+                    result = container.exec_run(command)
+                    if result.exit_code != 0:
+                        raise RuntimeError(result.output.decode())
+                print(f"WireGuard peers updated in place ({len(added)} added, {len(removed)} removed)")
+                return True, 'incremental'
+            except Exception as e:
+                print(f"Warning: incremental apply failed, falling back to syncconf: {e}")
+            finally:
+                for path in staged:
+                    os.remove(path)
+
+        return WireGuardService.reload_wireguard_config(container), 'syncconf'
 
     @staticmethod
-    def reload_wireguard_config():
+    def reload_wireguard_config(container=None):
         """Reload WireGuard configuration using syncconf"""
         try:
             # Utiliser l'API Docker pour exécuter la commande dans le conteneur
-            container = WireGuardService._docker_client.containers.get(DOCKER_CONTAINER_NAME)
+            container = container or WireGuardService.get_container()
+            
+            # syncconf n'accepte pas les clés propres à wg-quick (Address, PostUp...) : les retirer
+            server_config_path = f"{WIREGUARD_CONTAINER_CONFIG_PATH}/{SERVER_CONFIG_PATH}"
             result = container.exec_run(
-                ["wg", "syncconf", "wg0", "/config/wg_confs/wg0.conf"]
+                ["bash", "-c", f"wg syncconf {WIREGUARD_INTERFACE} <(wg-quick strip {server_config_path})"]
             )
             
             if result.exit_code == 0:
                 print("WireGuard configuration reloaded successfully")
+                return True
             else:
                 print(f"Warning: Could not reload WireGuard config automatically: {result.output.decode()}")
                 
@@ -79,13 +261,14 @@ AllowedIPs = {peer_ip}/32
             print(f"Error with Docker API: {e}")
         except Exception as e:
             print(f"Unexpected error reloading WireGuard config: {e}")
+        return False
 
     @staticmethod
-    def restart_wireguard_container():
+    def restart_wireguard_container(container=None):
         """Restart the entire WireGuard container using Docker Python SDK"""
         try:
             # Récupérer le conteneur
-            container = WireGuardService._docker_client.containers.get(DOCKER_CONTAINER_NAME)
+            container = container or WireGuardService.get_container()
             
             # Redémarrer le conteneur
             container.restart(timeout=30)
@@ -100,8 +283,22 @@ AllowedIPs = {peer_ip}/32
             return False, f"Unexpected error: {str(e)}"
             
     @staticmethod
-    def remove_peer_from_server_config(peer_name):
+    def remove_peer_from_server_config(peer_name, peer_paths=None):
         """Remove peer configuration from server's wg0.conf"""
+        success, result = WireGuardService.remove_peers_from_server_config([peer_name], peer_paths)
+        if not success:
+            return False, result
+        return True, result
+
+    @staticmethod
+    def remove_peers_from_server_config(peer_names, peer_paths=None):
+        """Remove several peers from wg0.conf with a single write
+
+        `peer_paths(name)` may return the peer files to delete in the same
+        transaction as wg0.conf.
+        Returns (True, [removed peer sections]) or (False, error message).
+        The change still has to be applied with apply_peer_changes().
+        """
         try:
             server_config_path = os.path.join(WIREGUARD_PATH, SERVER_CONFIG_PATH)
             
@@ -109,57 +306,23 @@ AllowedIPs = {peer_ip}/32
             if not os.path.exists(server_config_path):
                 return False, f"Server configuration file not found: {server_config_path}"
             
-            # Lire le contenu actuel du fichier
-            with open(server_config_path, 'r') as f:
-                lines = f.readlines()
-            
-            # Trouver et supprimer la section [Peer] correspondante
-            new_lines = []
-            i = 0
-            while i < len(lines):
-                line = lines[i]
-                
-                # Vérifier si c'est le début d'une section [Peer] avec le bon nom
-                if line.strip().startswith('[Peer]'):
-                    # Regarder les lignes suivantes pour trouver le commentaire avec le nom du peer
-                    peer_section_start = i
-                    peer_comment_found = False
-                    
-                    # Avancer jusqu'à la prochaine section [Peer] ou fin du fichier
-                    j = i + 1
-                    while j < len(lines) and not lines[j].strip().startswith('['):
-                        # Vérifier si cette ligne contient le commentaire avec le nom du peer
-                        if f"# {peer_name}" in lines[j]:
-                            peer_comment_found = True
-                            break
-                        j += 1
-                    
-                    # Si on a trouvé le peer, sauter toute cette section
-                    if peer_comment_found:
-                        # Trouver la fin de cette section [Peer]
-                        k = j + 1
-                        while k < len(lines) and not lines[k].strip().startswith('['):
-                            k += 1
-                        # Sauter toute la section
-                        i = k
-                        continue
-                    else:
-                        # Ce n'est pas le bon peer, garder cette section
-                        new_lines.append(line)
-                        i += 1
-                else:
-                    # Ce n'est pas une section [Peer], garder la ligne
-                    new_lines.append(line)
-                    i += 1
-            
-            # Réécrire le fichier sans la section du peer
-            with open(server_config_path, 'w') as f:
-                f.writelines(new_lines)
-            
-            # Recharger la configuration WireGuard
-            WireGuardService.reload_wireguard_config()
+            # Supprimer les sections [Peer] correspondantes du modèle en mémoire
+            removed = []
+            deletes = []
+            with ConfigStore.transaction(), WireGuardService._config_lock:
+                server_config = WireGuardService.get_server_config()
+                allocator = WireGuardService.get_ip_allocator()
+                for peer_name in peer_names:
+                    peer = server_config.remove_peer(peer_name)
+                    if peer:
+                        removed.append(peer)
+                        for allowed_ip in (peer['allowed_ips'] or '').split(','):
+                            allocator.release(allowed_ip.strip())
+                    if peer_paths is not None:
+                        deletes.extend(peer_paths(peer_name))
+                WireGuardService.save_server_config(server_config, deletes=deletes)
             
-            return True, f"Peer {peer_name} removed from server configuration"
+            return True, removed
             
         except Exception as e:
-            return False, f"Error removing peer from server config: {str(e)}"
\ No newline at end of file
+            return False, f"Error removing peer from server config: {str(e)}"
@@ -0,0 +1,112 @@
+import threading
+import time
+from collections import OrderedDict
+
+class _Flight:
+    """Chargement en cours partagé par les appelants concurrents d'une même clé"""
+
+    def __init__(self):
+        self.event = threading.Event()
+        self.value = None
+        self.error = None
+
+class TTLCache:
+    """Cache LRU borné avec expiration (TTL) et coalescence des chargements
+
+    Quand plusieurs threads demandent la même clé absente du cache, un seul
+    exécute le chargement ; les autres attendent et reçoivent le même résultat.
+    """
+
+    def __init__(self, ttl, max_size):
+        self.ttl = ttl
+        self.max_size = max_size
+        self._entries = OrderedDict()  # clé -> (expiration, valeur)
+        self._inflight = {}
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.coalesced = 0
+        self.evictions = 0
+
+    def get_or_load(self, key, loader, cacheable=None):
+        """Retourne la valeur en cache pour `key`, ou la charge avec `loader()`
+
+        `cacheable(valeur)` permet d'exclure certains résultats (ex: erreurs).
+        """
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[0] > time.monotonic():
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return entry[1]
+
+            flight = self._inflight.get(key)
+            leader = flight is None
+            if leader:
+                self.misses += 1
+                flight = _Flight()
+                self._inflight[key] = flight
+            else:
+                self.coalesced += 1
+
+        if not leader:
+            flight.event.wait()
+            if flight.error is not None:
+                raise flight.error
+            return flight.value
+
+        try:
+            flight.value = loader()
+            if cacheable is None or cacheable(flight.value):
+                self.set(key, flight.value)
+            return flight.value
+        except Exception as e:
+            flight.error = e
+            raise
+        finally:
+            with self._lock:
+                self._inflight.pop(key, None)
+            flight.event.set()
+
+    def set(self, key, value):
+        """Ajoute une valeur et évince les entrées les moins récemment utilisées"""
+        with self._lock:
+            self._entries[key] = (time.monotonic() + self.ttl, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def peek(self, key):
+        """Retourne la dernière valeur connue pour `key`, même expirée"""
+        with self._lock:
+            entry = self._entries.get(key)
+            return entry[1] if entry is not None else None
+
+    def discard(self, match):
+        """Retire les entrées dont la clé vérifie `match(clé)`, retourne leur nombre"""
+        with self._lock:
+            keys = [key for key in self._entries if match(key)]
+            for key in keys:
+                del self._entries[key]
+            return len(keys)
+
+    def clear(self):
+        """Vide le cache"""
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self):
+        """Retourne les compteurs du cache"""
+        with self._lock:
+            lookups = self.hits + self.misses + self.coalesced
+            return {
+                'size': len(self._entries),
+                'max_size': self.max_size,
+                'ttl_seconds': self.ttl,
+                'hits': self.hits,
+                'misses': self.misses,
+                'coalesced': self.coalesced,
+                'evictions': self.evictions,
+                'hit_ratio': round((self.hits + self.coalesced) / lookups, 3) if lookups else 0
+            }
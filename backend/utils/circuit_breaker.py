@@ -0,0 +1,106 @@
+import threading
+import time
+from collections import deque
+
+class CircuitBreaker:
+    """Disjoncteur pour un service distant
+
+    Le circuit s'ouvre quand le taux d'erreur des derniers appels dépasse un
+    seuil, ou quand un health check échoue. Tant qu'il est ouvert, les appels
+    doivent échouer immédiatement ; un thread de fond sonde le service avec un
+    backoff exponentiel et referme le circuit dès que la sonde réussit.
+    """
+
+    CLOSED = 'closed'
+    OPEN = 'open'
+
+    def __init__(self, probe, window_size=20, min_calls=5, error_rate=0.5,
+                 backoff_min=1, backoff_max=60, name='circuit'):
+        self.probe = probe
+        self.min_calls = min_calls
+        self.error_rate = error_rate
+        self.backoff_min = backoff_min
+        self.backoff_max = backoff_max
+        self.name = name
+        self.state = self.CLOSED
+        self.opened_at = None
+        self.last_probe_at = None
+        self._outcomes = deque(maxlen=window_size)
+        self._lock = threading.Lock()
+        self._prober = None
+
+    def allow_request(self):
+        """Indique si un appel peut être envoyé au service"""
+        return self.state == self.CLOSED
+
+    def is_open(self):
+        return self.state == self.OPEN
+
+    def record_success(self):
+        with self._lock:
+            self._outcomes.append(True)
+
+    def record_failure(self):
+        with self._lock:
+            self._outcomes.append(False)
+            failures = self._outcomes.count(False)
+            should_open = (
+                len(self._outcomes) >= self.min_calls
+                and failures / len(self._outcomes) >= self.error_rate
+            )
+        if should_open:
+            self.trip()
+
+    def record_health(self, healthy):
+        """Prend en compte le résultat d'un health check explicite"""
+        if healthy:
+            self.reset()
+        else:
+            self.trip()
+
+    def trip(self):
+        """Ouvre le circuit et démarre la sonde de fond si nécessaire"""
+        with self._lock:
+            if self.state == self.OPEN:
+                return
+            self.state = self.OPEN
+            self.opened_at = time.time()
+            print(f"Circuit {self.name} opened, failing fast")
+
+            self._prober = threading.Thread(target=self._probe_loop, name=f"{self.name}-probe")
+            self._prober.daemon = True
+            self._prober.start()
+
+    def reset(self):
+        """Referme le circuit"""
+        with self._lock:
+            if self.state == self.OPEN:
+                print(f"Circuit {self.name} closed, service is back")
+            self.state = self.CLOSED
+            self.opened_at = None
+            self._outcomes.clear()
+
+    def _probe_loop(self):
+        backoff = self.backoff_min
+        while self.state == self.OPEN:
+            time.sleep(backoff)
+            self.last_probe_at = time.time()
+            try:
+                healthy = self.probe()
+            except Exception:
+                healthy = False
+
+            if healthy:
+                self.reset()
+                return
+            backoff = min(backoff * 2, self.backoff_max)
+
+    def status(self):
+        with self._lock:
+            return {
+                'state': self.state,
+                'opened_at': self.opened_at,
+                'last_probe_at': self.last_probe_at,
+                'recent_calls': len(self._outcomes),
+                'recent_failures': self._outcomes.count(False)
+            }
@@ -0,0 +1,64 @@
+DOWNSAMPLE_METHODS = ('lttb', 'minmax')
+
+def lttb_indices(x, y, threshold):
+    """Indices of the points kept by Largest-Triangle-Three-Buckets
+
+    Keeps the first and last points and, in each of the threshold - 2
+    buckets in between, the point forming the largest triangle with the
+    point kept in the previous bucket and the average of the next bucket,
+    which preserves the visual shape of the series.
+    """
+    length = len(x)
+    if threshold >= length or threshold < 3:
+        return list(range(length))
+
+    indices = [0]
+    bucket_size = (length - 2) / (threshold - 2)
+    previous = 0
+    for bucket in range(threshold - 2):
+        start = int(bucket * bucket_size) + 1
+        end = int((bucket + 1) * bucket_size) + 1
+
+        # Moyenne du bucket suivant (le dernier point pour le dernier bucket)
+        next_start, next_end = end, min(int((bucket + 2) * bucket_size) + 1, length)
+        if next_start >= next_end:
+            next_start, next_end = length - 1, length
+        count = next_end - next_start
+        average_x = sum(x[next_start:next_end]) / count
+        average_y = sum(y[next_start:next_end]) / count
+
+        best, best_area = start, -1.0
+        previous_x, previous_y = x[previous], y[previous]
+        for index in range(start, end):
+            area = abs(
+                (previous_x - average_x) * (y[index] - previous_y)
+                - (previous_x - x[index]) * (average_y - previous_y)
+            )
+            if area > best_area:
+                best, best_area = index, area
+        indices.append(best)
+        previous = best
+
+    indices.append(length - 1)
+    return indices
+
+def minmax_indices(y, threshold):
+    """Indices of the minimum and maximum of each of threshold / 2 buckets, in order
+
+    Keeps every peak and trough, at the cost of the points in between.
+    """
+    length = len(y)
+    buckets = threshold // 2
+    if threshold >= length or buckets < 1:
+        return list(range(length))
+
+    indices = []
+    bucket_size = length / buckets
+    for bucket in range(buckets):
+        start, end = int(bucket * bucket_size), int((bucket + 1) * bucket_size)
+        if start >= end:
+            continue
+        low = min(range(start, end), key=y.__getitem__)
+        high = max(range(start, end), key=y.__getitem__)
+        indices.extend(sorted({low, high}))
+    return indices
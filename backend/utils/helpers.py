@@ -1,22 +1,53 @@
-import os
+import math
+from config.settings import HISTORY_MAX_HOURS, HISTORY_DEFAULT_POINTS, HISTORY_MAX_POINTS
+from utils.downsample import DOWNSAMPLE_METHODS
+
+# Directories of WIREGUARD_PATH that are not peers
+RESERVED_DIRECTORIES = ['server', 'templates', 'wg_confs', 'coredns', 'peer_client1']
 
 def sanitize_peer_name(name):
     """Clean the peer name to avoid path traversal"""
     return "".join(c for c in name if c.isalnum() or c in ('-', '_')).lower()
 
-def peer_exists(peer_name, wireguard_path):
-    """Check if a peer directory already exists"""
-    peer_dir = os.path.join(wireguard_path, peer_name)
-    return os.path.exists(peer_dir)
+def parse_duration(duration):
+    """Convert a Prometheus duration ('15s', '1m', '2h', '1d') or a number to seconds"""
+    if isinstance(duration, (int, float)):
+        return duration
+    units = {'s': 1, 'm': 60, 'h': 3600, 'd': 86400, 'w': 604800}
+    duration = str(duration).strip()
+    if duration and duration[-1] in units:
+        return float(duration[:-1]) * units[duration[-1]]
+    return float(duration)
+
+
+def parse_history_params(args):
+    """Read hours, points, downsample and format of a history request
 
-def list_existing_peers(wireguard_path):
-    """List all existing peers"""
-    peers = []
+    Returns (hours, points, downsample, format), with hours capped at
+    HISTORY_MAX_HOURS. points is None for the points format without points
+    nor downsample, which keeps the former one-minute step up to 24 hours
+    and is capped to 1440 points beyond; the other requests default to
+    HISTORY_DEFAULT_POINTS. Raises ValueError on an invalid value.
+    """
     try:
-        for f in os.listdir(wireguard_path):
-            if os.path.isdir(os.path.join(wireguard_path, f)) and f not in ['server', 'templates', 'wg_confs', 'coredns', 'peer_client1']:
-                # return as objects with a `name` key to match requested format
-                peers.append({"name": f})
-    except FileNotFoundError:
-        pass
-    return peers
\ No newline at end of file
+        hours = float(args.get('hours', 1))
+        points = int(args['points']) if args.get('points') is not None else None
+    except ValueError:
+        raise ValueError("hours and points must be numbers")
+    if not math.isfinite(hours) or hours <= 0:
+        raise ValueError("hours must be a positive number")
+    if points is not None and not 3 <= points <= HISTORY_MAX_POINTS:
+        raise ValueError(f"points must be between 3 and {HISTORY_MAX_POINTS}")
+
+    downsample = args.get('downsample') or None
+    if downsample is not None and downsample not in DOWNSAMPLE_METHODS:
+        raise ValueError(f"downsample must be one of {', '.join(DOWNSAMPLE_METHODS)}")
+
+    fmt = args.get('format', 'points')
+    if fmt not in ('points', 'columns'):
+        raise ValueError("format must be points or columns")
+    if points is None and (fmt != 'points' or downsample):
+        points = HISTORY_DEFAULT_POINTS
+
+    hours = min(hours, float(HISTORY_MAX_HOURS))
+    return (int(hours) if hours.is_integer() else hours), points, downsample, fmt
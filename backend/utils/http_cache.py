@@ -0,0 +1,52 @@
+import hashlib
+from datetime import datetime, timezone
+from functools import wraps
+from flask import request, make_response, Response
+from werkzeug.http import is_resource_modified
+
+def conditional(validators):
+    """Answer 304 Not Modified before running the view when nothing changed
+
+    `validators()` returns the list of (tag, timestamp) the response depends
+    on, e.g. PeerRegistry.state() and MetricsStore.validator() for the
+    background metrics snapshot; a None in the list means that state is not
+    collected yet, so the view runs and that part is taken again
+    afterwards. The ETag is derived from the tags
+    and Last-Modified from the latest timestamp. Known validators are taken
+    before the view runs, so a change made meanwhile only costs the client
+    one more full response.
+    """
+    def decorator(view):
+        @wraps(view)
+        def wrapper(*args, **kwargs):
+            parts = validators()
+            if all(part is not None for part in parts):
+                etag, last_modified = _validators(parts)
+                if not is_resource_modified(request.environ, etag=etag, last_modified=last_modified):
+                    return _with_validators(Response(status=304), etag, last_modified)
+
+            response = make_response(view(*args, **kwargs))
+            if response.status_code != 200:
+                return response
+
+            # États rechargés par la vue (ex: métriques expirées)
+            parts = [part if part is not None else fresh for part, fresh in zip(parts, validators())]
+            if any(part is None for part in parts):
+                return response
+            return _with_validators(response, *_validators(parts))
+        return wrapper
+    return decorator
+
+# ===== HELPERS =====
+
+def _validators(parts):
+    etag = hashlib.sha1('|'.join(tag for tag, _ in parts).encode('utf-8')).hexdigest()[:20]
+    last_modified = datetime.fromtimestamp(int(max(timestamp for _, timestamp in parts)), timezone.utc)
+    return etag, last_modified
+
+def _with_validators(response, etag, last_modified):
+    response.set_etag(etag)
+    response.last_modified = last_modified
+    # Toujours revalider : la réponse 304 ne coûte presque rien
+    response.headers["Cache-Control"] = "private, no-cache"
+    return response
@@ -0,0 +1,38 @@
+import threading
+
+class CounterRates:
+    """Per-second rates of byte counters, computed from consecutive samples
+
+    update() takes the counters of a sample and returns the rates since the
+    previous sample for the keys present in both. Giving the same sample
+    again returns the same rates. A counter that went down was reset
+    (interface restarted) and is counted from zero, as Prometheus does.
+    """
+
+    def __init__(self):
+        self._sampled_at = None
+        self._counters = {}
+        self._rates = {}
+        self._lock = threading.Lock()
+
+    def update(self, sampled_at, counters):
+        """`counters` maps a key to a tuple of counters, returns key -> tuple of rates"""
+        with self._lock:
+            if sampled_at == self._sampled_at:
+                return self._rates
+
+            elapsed = sampled_at - self._sampled_at if self._sampled_at is not None else 0
+            rates = {}
+            if elapsed > 0:
+                for key, values in counters.items():
+                    previous = self._counters.get(key)
+                    if previous is not None:
+                        rates[key] = tuple(
+                            (current - before if current >= before else current) / elapsed
+                            for before, current in zip(previous, values)
+                        )
+
+            self._sampled_at = sampled_at
+            self._counters = counters
+            self._rates = rates
+            return rates
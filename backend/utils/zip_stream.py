@@ -0,0 +1,41 @@
+import io
+import time
+import zipfile
+
+class _ChunkWriter(io.RawIOBase):
+    """Unseekable sink collecting what ZipFile writes until it is drained"""
+
+    def __init__(self):
+        self._chunks = []
+
+    def writable(self):
+        return True
+
+    def write(self, data):
+        self._chunks.append(bytes(data))
+        return len(data)
+
+    def drain(self):
+        data = b''.join(self._chunks)
+        self._chunks = []
+        return data
+
+def stream_zip(entries):
+    """Yield a ZIP archive chunk by chunk
+
+    `entries` is an iterable of (name, content, compress) where content is
+    str or bytes. Only one entry is held in memory at a time: on an
+    unseekable output ZipFile writes data descriptors instead of going back
+    to patch the local headers. What remains is the central directory index
+    (a few hundred bytes per entry), written at the end.
+    """
+    sink = _ChunkWriter()
+    with zipfile.ZipFile(sink, 'w') as archive:
+        for name, content, compress in entries:
+            info = zipfile.ZipInfo(name, date_time=time.localtime()[:6])
+            info.compress_type = zipfile.ZIP_DEFLATED if compress else zipfile.ZIP_STORED
+            info.external_attr = 0o600 << 16
+            archive.writestr(info, content)
+            yield sink.drain()
+    # Répertoire central écrit à la fermeture
+    yield sink.drain()